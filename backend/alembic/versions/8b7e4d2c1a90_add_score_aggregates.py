@@ -0,0 +1,37 @@
+"""Add score_aggregates and index scores.played_at
+
+Revision ID: 8b7e4d2c1a90
+Revises: 3f2a9c1d7e45
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b7e4d2c1a90'
+down_revision: Union[str, Sequence[str], None] = '3f2a9c1d7e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('score_aggregates',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('mode', sa.String(), nullable=False),
+    sa.Column('archived_games', sa.Integer(), nullable=False),
+    sa.Column('histogram', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'mode')
+    )
+    op.create_index(op.f('ix_scores_played_at'), 'scores', ['played_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scores_played_at'), table_name='scores')
+    op.drop_table('score_aggregates')
@@ -0,0 +1,49 @@
+"""
+Benchmark the spectator bot fleet.
+
+Ticks a fleet synchronously and reports CPU time per bot-tick, plus how many
+bots fit in one frame at the configured tick rate.
+
+    uv run python benchmarks/bot_fleet.py --bots 2000 --ticks 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.bots import BotFleet, SPECTATOR_BOT_TICK_MS, SPECTATOR_BOT_GRID_SIZE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bots", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--grid", type=int, default=SPECTATOR_BOT_GRID_SIZE)
+    parser.add_argument("--tick-ms", type=int, default=SPECTATOR_BOT_TICK_MS)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    fleet = BotFleet(count=args.bots, tick_ms=args.tick_ms, grid_size=args.grid, seed=args.seed)
+
+    wall_start = time.perf_counter()
+    for _ in range(args.ticks):
+        fleet.tick_all()
+    wall = time.perf_counter() - wall_start
+
+    per_tick_us = fleet.cpu_seconds / fleet.bot_ticks * 1e6
+    games = sum(bot.games_played for bot in fleet.bots)
+    best = max((max(bot.best_score, bot.score) for bot in fleet.bots), default=0)
+    avg_length = sum(len(bot.snake) for bot in fleet.bots) / max(1, len(fleet.bots))
+
+    print(f"bots:              {args.bots} on {args.grid}x{args.grid}")
+    print(f"bot-ticks:         {fleet.bot_ticks}")
+    print(f"cpu per bot-tick:  {per_tick_us:.1f} us")
+    print(f"wall per frame:    {wall / args.ticks * 1000:.1f} ms (tick every {args.tick_ms} ms)")
+    print(f"bots per frame:    {int(args.tick_ms * 1000 / per_tick_us)} at 100% of a tick")
+    print(f"games finished:    {games}, best score {best}, avg length {avg_length:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,35 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from src.routers import auth, leaderboard, spectator, game
+from src.routers import auth, leaderboard, spectator, game, admin, stats
+from src.ratelimit import ConcurrencyLimitMiddleware
+from src.bots import bot_fleet
+from src.stats import score_stats
+from contextlib import asynccontextmanager
 import os
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spectator bots (SPECTATOR_BOTS=0 disables them)
+    bot_fleet.start()
+    # Periodically persist score statistics (and once more on shutdown)
+    score_stats.start()
+    yield
+    await bot_fleet.stop()
+    await score_stats.stop()
+
 app = FastAPI(
     title="Vibe Coding Snake Game API",
     description="Backend API for the Vibe Coding Snake Game",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Shed load with 503 before requests pile up behind a saturated worker
+# (added first so CORS headers still wrap the rejection). Long-lived SSE
+# streams are exempt, they would otherwise hold a slot each.
+app.add_middleware(ConcurrencyLimitMiddleware, exempt_paths=("/api/leaderboard/stream",))
+
 # CORS Configuration - Allow all origins in development
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +45,8 @@ app.include_router(auth.router, prefix="/api")
 app.include_router(leaderboard.router, prefix="/api")
 app.include_router(spectator.router, prefix="/api")
 app.include_router(game.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(stats.router, prefix="/api")
 
 @app.get("/api/health")
 async def health_check():
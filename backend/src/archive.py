@@ -0,0 +1,221 @@
+"""
+Archival compaction of the `scores` table.
+
+Scores played before a horizon are moved, in batches, into monthly partition
+tables (`scores_archive_YYYYMM`, same columns as `scores`). The insert, the
+delete and the `score_aggregates` update share one transaction, so an
+interrupted run never loses or duplicates a row and can simply be restarted.
+
+Two kinds of rows always stay hot however old they are:
+
+- each user's best score per mode, so per-user bests need no archive lookups
+- the top `LEADERBOARD_SIZE` scores per mode, so the leaderboard is unchanged
+
+`score_aggregates` keeps a histogram of everything archived per user and
+mode. Score statistics (src/stats.py) merge those instead of reading the
+partitions, so a rebuild only scans the hot table.
+
+Archival therefore changes no cached view (boards, ranks, statistics and their
+persisted sketches all stay valid) and does not invalidate them.
+"""
+import os
+import statistics
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, MetaData, Table, delete, func, inspect, select, text, tuple_
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .db.models import Score, ScoreAggregate
+from .models import GameMode
+from .leaderboard_cache import LEADERBOARD_SIZE
+from .stats import ScoreHistogram
+
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "180"))
+ARCHIVE_TABLE_PREFIX = "scores_archive_"
+BATCH_SIZE = 1000
+
+_archive_metadata = MetaData()
+
+
+def partition_name(played_at: datetime) -> str:
+    return f"{ARCHIVE_TABLE_PREFIX}{played_at:%Y%m}"
+
+
+def partition_table(name: str) -> Table:
+    if name in _archive_metadata.tables:
+        return _archive_metadata.tables[name]
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in Score.__table__.columns
+    ]
+    return Table(name, _archive_metadata, *columns)
+
+
+def archive_tables(bind) -> List[Table]:
+    names = inspect(bind).get_table_names()
+    return [partition_table(name) for name in sorted(names) if name.startswith(ARCHIVE_TABLE_PREFIX)]
+
+
+def kept_ids(db: Session) -> set:
+    """Ids that must stay hot: per-user/per-mode bests and each mode's top scores."""
+    ids = set()
+    for mode in GameMode:
+        ids.update(db.execute(
+            select(Score.id)
+            .where(Score.mode == mode.value)
+            .order_by(Score.score.desc(), Score.played_at.asc(), Score.id.asc())
+            .limit(LEADERBOARD_SIZE)
+        ).scalars())
+
+    ranked = select(
+        Score.id,
+        func.row_number().over(
+            partition_by=(Score.user_id, Score.mode),
+            order_by=(Score.score.desc(), Score.played_at.asc(), Score.id.asc()),
+        ).label("position"),
+    ).subquery()
+    ids.update(db.execute(select(ranked.c.id).where(ranked.c.position == 1)).scalars())
+    return ids
+
+
+# ---- Measurements for the report ----
+
+def table_bytes(db: Session, table: str) -> Optional[int]:
+    """On-disk size of a table where the database can tell us, else None."""
+    dialect = db.get_bind().dialect.name
+    try:
+        if dialect == "postgresql":
+            return db.execute(text("SELECT pg_total_relation_size(:t)"), {"t": table}).scalar()
+        if dialect == "sqlite":
+            return db.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name = :t"), {"t": table}).scalar()
+    except DBAPIError:
+        # dbstat is an optional SQLite extension
+        db.rollback()
+    return None
+
+
+def query_latency_ms(db: Session, runs: int = 5) -> Dict[str, float]:
+    """Median time of the hot-table queries the leaderboard and stats rely on."""
+    queries = {
+        "leaderboard_top": select(Score.id, Score.score)
+            .order_by(Score.score.desc(), Score.played_at.asc(), Score.id.asc())
+            .limit(LEADERBOARD_SIZE),
+        "user_bests": select(Score.user_id, Score.mode, func.max(Score.score))
+            .group_by(Score.user_id, Score.mode),
+    }
+    result = {}
+    for name, query in queries.items():
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            db.execute(query).all()
+            timings.append((time.perf_counter() - start) * 1000)
+        result[name] = round(statistics.median(timings), 3)
+    return result
+
+
+def table_report(db: Session) -> dict:
+    return {
+        "rows": db.query(func.count(Score.id)).scalar(),
+        "bytes": table_bytes(db, Score.__tablename__),
+        "latencyMs": query_latency_ms(db),
+    }
+
+
+# ---- The job ----
+
+@dataclass
+class ArchiveReport:
+    cutoff: datetime
+    archived: int = 0
+    partitions: Dict[str, int] = field(default_factory=dict)
+    before: dict = field(default_factory=dict)
+    after: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "cutoff": self.cutoff.isoformat(),
+            "archived": self.archived,
+            "partitions": self.partitions,
+            "before": self.before,
+            "after": self.after,
+        }
+
+
+def _update_aggregates(db: Session, rows: List[dict]) -> None:
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["user_id"], row["mode"])].append(row)
+
+    # One query per batch; a lookup per group would autoflush every time
+    existing = {
+        (aggregate.user_id, aggregate.mode): aggregate
+        for aggregate in db.query(ScoreAggregate).filter(ScoreAggregate.user_id.in_({key[0] for key in groups}))
+    }
+    for (user_id, mode), items in groups.items():
+        aggregate = existing.get((user_id, mode))
+        if aggregate is None:
+            aggregate = ScoreAggregate(user_id=user_id, mode=mode, archived_games=0)
+            db.add(aggregate)
+            histogram = ScoreHistogram()
+        else:
+            histogram = ScoreHistogram.from_json(aggregate.histogram)
+        for item in items:
+            histogram.add(item["score"])
+        aggregate.archived_games += len(items)
+        aggregate.histogram = histogram.to_json()
+
+
+def archive_scores(
+    db: Session,
+    horizon_days: int = ARCHIVE_HORIZON_DAYS,
+    batch_size: int = BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> ArchiveReport:
+    """
+    Move scores older than `horizon_days` into partition tables and report the
+    effect. Safe to run next to a live server, which keeps its caches.
+    """
+    now = now or datetime.now(timezone.utc)
+    # Stored datetimes are naive UTC
+    cutoff = now.replace(tzinfo=None) - timedelta(days=horizon_days)
+    report = ArchiveReport(cutoff=cutoff, before=table_report(db))
+    keep = kept_ids(db)
+    scores = Score.__table__
+
+    last = None
+    while True:
+        # Keyset pagination: unaffected by the rows deleted behind it
+        query = select(scores).where(scores.c.played_at < cutoff)
+        if last is not None:
+            query = query.where(tuple_(scores.c.played_at, scores.c.id) > last)
+        rows = db.execute(query.order_by(scores.c.played_at, scores.c.id).limit(batch_size)).mappings().all()
+        if not rows:
+            break
+        last = (rows[-1]["played_at"], rows[-1]["id"])
+
+        moving = [dict(row) for row in rows if row["id"] not in keep]
+        if not moving:
+            continue
+
+        by_partition = defaultdict(list)
+        for row in moving:
+            by_partition[partition_name(row["played_at"])].append(row)
+        for name, partition_rows in by_partition.items():
+            table = partition_table(name)
+            table.create(bind=db.connection(), checkfirst=True)
+            db.execute(table.insert(), partition_rows)
+            report.partitions[name] = report.partitions.get(name, 0) + len(partition_rows)
+
+        db.execute(delete(scores).where(scores.c.id.in_([row["id"] for row in moving])))
+        _update_aggregates(db, moving)
+        db.commit()
+        report.archived += len(moving)
+
+    report.after = table_report(db)
+    return report
@@ -0,0 +1,367 @@
+"""
+Server-side bot fleet for the spectator lobby.
+
+Bots play the same rules as `frontend/src/lib/gameLogic.ts` on a flat grid of
+cell indices (`y * size + x`). Each tick a bot follows a cached BFS path to
+the food. A path is only taken after playing it out on a copy of the board
+and checking that the head can still reach the tail afterwards; otherwise the
+bot chases its own tail until the food is safe to take.
+
+All bots on the same grid share one `PathPlanner`, whose BFS buffers are
+allocated once and invalidated with a generation stamp instead of being
+cleared, so a tick allocates almost nothing. The fleet runs on the event loop
+and gives up the rest of a frame once it has used its time budget.
+"""
+import asyncio
+import os
+import random
+import time
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from .models import ActivePlayer, Direction, GameMode, GameState, GameStatus, Position
+
+SPECTATOR_BOTS = int(os.getenv("SPECTATOR_BOTS", "0"))
+SPECTATOR_BOT_TICK_MS = int(os.getenv("SPECTATOR_BOT_TICK_MS", "150"))
+SPECTATOR_BOT_GRID_SIZE = int(os.getenv("SPECTATOR_BOT_GRID_SIZE", "20"))
+# Room for the starting snake at one end, and few enough cells to render per frame
+MIN_GRID_SIZE, MAX_GRID_SIZE = 8, 64
+# Share of each tick the fleet may spend on the event loop
+SPECTATOR_BOT_FRAME_BUDGET = float(os.getenv("SPECTATOR_BOT_FRAME_BUDGET", "0.5"))
+
+# Mirrors gameLogic.ts
+INITIAL_SPEED = 150
+SPEED_INCREMENT = 5
+MIN_SPEED = 50
+FOOD_POINTS = 10
+
+DIRECTIONS = (Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT)
+DELTAS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+OPPOSITE = (1, 0, 3, 2)
+
+
+class PathPlanner:
+    """Neighbour tables and reusable BFS scratch buffers for one grid size and mode."""
+
+    def __init__(self, size: int, mode: GameMode):
+        self.size = size
+        self.cells = size * size
+        self.neighbors: List[Tuple[Tuple[int, int], ...]] = [
+            self._neighbors_of(cell, mode) for cell in range(self.cells)
+        ]
+        self._seen = array("I", bytes(4 * self.cells))
+        self._parent = array("i", bytes(4 * self.cells))
+        self._queue = array("i", bytes(4 * self.cells))
+        self._stamp = 0
+
+    def _neighbors_of(self, cell: int, mode: GameMode) -> Tuple[Tuple[int, int], ...]:
+        x, y = cell % self.size, cell // self.size
+        result = []
+        for direction, (dx, dy) in enumerate(DELTAS):
+            nx, ny = x + dx, y + dy
+            if mode == GameMode.PASS_THROUGH:
+                nx, ny = nx % self.size, ny % self.size
+            elif not (0 <= nx < self.size and 0 <= ny < self.size):
+                continue
+            result.append((direction, ny * self.size + nx))
+        return tuple(result)
+
+    def _next_stamp(self) -> int:
+        self._stamp += 1
+        if self._stamp == 0xFFFFFFFF:
+            self._seen = array("I", bytes(4 * self.cells))
+            self._stamp = 1
+        return self._stamp
+
+    def find_path(self, start: int, goal: int, blocked: bytearray, passable: int = -1) -> Optional[List[int]]:
+        """Shortest path start -> goal (excluding start) avoiding `blocked` cells other than `passable`."""
+        stamp = self._next_stamp()
+        seen, parent, queue, neighbors = self._seen, self._parent, self._queue, self.neighbors
+        seen[start] = stamp
+        queue[0] = start
+        head, tail = 0, 1
+
+        while head < tail:
+            cell = queue[head]
+            head += 1
+            for _, nxt in neighbors[cell]:
+                if seen[nxt] == stamp or (blocked[nxt] and nxt != passable):
+                    continue
+                seen[nxt] = stamp
+                parent[nxt] = cell
+                if nxt == goal:
+                    path = [goal]
+                    while parent[path[-1]] != start:
+                        path.append(parent[path[-1]])
+                    path.reverse()
+                    return path
+                queue[tail] = nxt
+                tail += 1
+        return None
+
+    def reachable(self, start: int, goal: int, blocked: bytearray) -> bool:
+        """True when `goal` can be reached from `start`; `goal` itself may be blocked."""
+        return start == goal or self.find_path(start, goal, blocked, passable=goal) is not None
+
+    def flood_area(self, start: int, blocked: bytearray) -> int:
+        stamp = self._next_stamp()
+        seen, queue, neighbors = self._seen, self._queue, self.neighbors
+        seen[start] = stamp
+        queue[0] = start
+        head, tail = 0, 1
+        while head < tail:
+            cell = queue[head]
+            head += 1
+            for _, nxt in neighbors[cell]:
+                if seen[nxt] != stamp and not blocked[nxt]:
+                    seen[nxt] = stamp
+                    queue[tail] = nxt
+                    tail += 1
+        return tail
+
+
+class Bot:
+    def __init__(self, bot_id: str, username: str, mode: GameMode, planner: PathPlanner, rng: random.Random):
+        self.id = bot_id
+        self.username = username
+        self.mode = mode
+        self.planner = planner
+        self.rng = rng
+        self.viewers = 0
+        self.games_played = 0
+        self.best_score = 0
+        self.reset()
+
+    def reset(self) -> None:
+        size = self.planner.size
+        center = (size // 2) * size + size // 2
+        self.body = bytearray(self.planner.cells)
+        self.snake = deque((center, center + 1, center + 2))
+        for cell in self.snake:
+            self.body[cell] = 1
+        self.direction = 2  # LEFT
+        self.score = 0
+        self.speed = INITIAL_SPEED
+        self.path: deque = deque()
+        self.food = self._place_food()
+
+    def _place_food(self) -> int:
+        cells, body = self.planner.cells, self.body
+        # Rejection sampling is fast while the board is mostly empty
+        for _ in range(32):
+            cell = self.rng.randrange(cells)
+            if not body[cell]:
+                return cell
+        free = [cell for cell in range(cells) if not body[cell]]
+        return self.rng.choice(free) if free else -1
+
+    def _is_safe(self, nxt: int) -> bool:
+        """Would the head still reach the tail after stepping onto `nxt`?"""
+        snake, body = self.snake, self.body
+        tail = snake[-1]
+        eats = nxt == self.food
+        new_tail = tail if eats else snake[-2]
+
+        # Apply the move to the occupancy grid, check, then undo it
+        if not eats:
+            body[tail] = 0
+        was_occupied = body[nxt]
+        body[nxt] = 1
+        safe = self.planner.reachable(nxt, new_tail, body)
+        body[nxt] = was_occupied
+        if not eats:
+            body[tail] = 1
+        return safe
+
+    def _legal_moves(self) -> List[Tuple[int, int]]:
+        tail = self.snake[-1]
+        return [
+            (direction, nxt) for direction, nxt in self.planner.neighbors[self.snake[0]]
+            if direction != OPPOSITE[self.direction] and (not self.body[nxt] or nxt == tail)
+        ]
+
+    def _path_is_safe(self, path: List[int]) -> bool:
+        """Play the whole path on a copy of the board; the tail must still be reachable at the end."""
+        body = bytearray(self.body)
+        snake = deque(self.snake)
+        last = len(path) - 1
+        for i, cell in enumerate(path):
+            if i < last:
+                body[snake.pop()] = 0
+            snake.appendleft(cell)
+            body[cell] = 1
+        return self.planner.reachable(snake[0], snake[-1], body)
+
+    def _choose(self) -> Optional[Tuple[int, int]]:
+        moves = self._legal_moves()
+        if not moves:
+            return None
+
+        # 1. Follow the verified path. Its cells were free when planned and only
+        #    the tail moves out of the way meanwhile, so no per-step check is needed.
+        if self.path:
+            nxt = self.path.popleft()
+            for move in moves:
+                if move[1] == nxt:
+                    return move
+            self.path.clear()
+
+        # 2. Plan towards the food, accepting the path only if we won't trap ourselves
+        head, tail = self.snake[0], self.snake[-1]
+        path = self.planner.find_path(head, self.food, self.body, passable=tail)
+        if path and self._path_is_safe(path):
+            self.path = deque(path[1:])
+            for move in moves:
+                if move[1] == path[0]:
+                    return move
+
+        # 3. Otherwise chase our own tail until the food becomes safe to take
+        path = self.planner.find_path(head, tail, self.body, passable=tail)
+        if path:
+            for move in moves:
+                if move[1] == path[0] and self._is_safe(path[0]):
+                    return move
+
+        # 4. Survive: any safe move, preferring the most open space
+        safe = [move for move in moves if self._is_safe(move[1])] or moves
+        if len(safe) == 1:
+            return safe[0]
+        return max(safe, key=lambda move: self.planner.flood_area(move[1], self.body))
+
+    def tick(self) -> bool:
+        """Advance one step. Returns False when the game ended (and was restarted)."""
+        move = self._choose()
+        if move is None:
+            self._game_over()
+            return False
+
+        self.direction, nxt = move
+        self.snake.appendleft(nxt)
+        if nxt == self.food:
+            self.body[nxt] = 1
+            self.score += FOOD_POINTS
+            self.speed = max(MIN_SPEED, self.speed - SPEED_INCREMENT)
+            self.food = self._place_food()
+            if self.food < 0:
+                # Filled the board
+                self._game_over()
+                return False
+        else:
+            self.body[self.snake.pop()] = 0
+            self.body[nxt] = 1
+        return True
+
+    def _game_over(self) -> None:
+        self.games_played += 1
+        self.best_score = max(self.best_score, self.score)
+        self.reset()
+
+    def _position(self, cell: int) -> Position:
+        return Position(x=cell % self.planner.size, y=cell // self.planner.size)
+
+    def to_active_player(self) -> ActivePlayer:
+        return ActivePlayer(
+            id=self.id,
+            username=self.username,
+            score=self.score,
+            mode=self.mode,
+            gameState=GameState(
+                snake=[self._position(cell) for cell in self.snake],
+                food=self._position(self.food),
+                direction=DIRECTIONS[self.direction],
+                score=self.score,
+                status=GameStatus.PLAYING,
+                mode=self.mode,
+                speed=self.speed,
+                gridSize=self.planner.size,
+            ),
+            viewers=self.viewers,
+        )
+
+
+class BotFleet:
+    def __init__(
+        self,
+        count: int = SPECTATOR_BOTS,
+        tick_ms: int = SPECTATOR_BOT_TICK_MS,
+        grid_size: int = SPECTATOR_BOT_GRID_SIZE,
+        frame_budget: float = SPECTATOR_BOT_FRAME_BUDGET,
+        seed: Optional[int] = None,
+    ):
+        if not MIN_GRID_SIZE <= grid_size <= MAX_GRID_SIZE:
+            raise ValueError(f"Bot grid size must be between {MIN_GRID_SIZE} and {MAX_GRID_SIZE}, got {grid_size}")
+        self.tick_interval = tick_ms / 1000
+        self.frame_budget = self.tick_interval * frame_budget
+        self.rng = random.Random(seed)
+        self.planners = {mode: PathPlanner(grid_size, mode) for mode in GameMode}
+        modes = list(GameMode)
+        self.bots: List[Bot] = []
+        self._by_id: Dict[str, Bot] = {}
+        for i in range(count):
+            mode = modes[i % len(modes)]
+            bot = Bot(f"bot-{i + 1}", f"SnakeBot-{i + 1:04d}", mode, self.planners[mode], self.rng)
+            self.bots.append(bot)
+            self._by_id[bot.id] = bot
+
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+        # Counters for monitoring / the benchmark
+        self.bot_ticks = 0
+        self.skipped_ticks = 0
+        self.cpu_seconds = 0.0
+
+    def get(self, bot_id: str) -> Optional[Bot]:
+        return self._by_id.get(bot_id)
+
+    def tick_all(self, deadline: Optional[float] = None) -> int:
+        """Tick every bot once, or as many as fit before `deadline` (perf_counter). Returns bots ticked."""
+        bots, count = self.bots, len(self.bots)
+        start_cpu = time.process_time()
+        ticked = 0
+        # Round-robin start so an overrun doesn't always starve the same bots
+        index = self._cursor
+        while ticked < count:
+            bots[index].tick()
+            ticked += 1
+            index = (index + 1) % count
+            if deadline is not None and (ticked & 63) == 0 and time.perf_counter() > deadline:
+                break
+        self._cursor = index
+        self.bot_ticks += ticked
+        self.skipped_ticks += count - ticked
+        self.cpu_seconds += time.process_time() - start_cpu
+        return ticked
+
+    async def run(self) -> None:
+        loop_start = time.perf_counter()
+        while True:
+            if self.bots:
+                self.tick_all(deadline=time.perf_counter() + self.frame_budget)
+            loop_start += self.tick_interval
+            delay = loop_start - time.perf_counter()
+            if delay < 0:
+                # Fell behind: drop the missed frames rather than bursting to catch up
+                loop_start = time.perf_counter()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        if self.bots and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def active_players(self, limit: int) -> List[ActivePlayer]:
+        top = sorted(self.bots, key=lambda bot: bot.score, reverse=True)[:limit]
+        return [bot.to_active_player() for bot in top]
+
+
+bot_fleet = BotFleet()
@@ -0,0 +1,207 @@
+"""
+Streaming bulk export/import of the `users` and `scores` tables.
+
+Export reads through a server-side cursor (`yield_per`) and writes NDJSON or
+CSV one batch at a time, so memory stays flat however large the table is.
+Import parses records straight into dicts and inserts them with batched
+`executemany` on a Core connection, skipping ORM object construction. Values
+are type-checked while parsing (the database may not, SQLite stores "abc" in
+an integer column), and a bad record stops the import with a ValueError. Each
+committed batch can be recorded in a checkpoint file so an interrupted
+import resumes where it stopped.
+"""
+import csv
+import io
+import itertools
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from sqlalchemy import DateTime, Integer, String, Table, select
+from sqlalchemy.engine import Connection
+
+from .db.models import User, Score
+from .models import GameMode
+from .leaderboard_cache import leaderboard_cache
+
+TABLES: Dict[str, Table] = {
+    "users": User.__table__,
+    "scores": Score.__table__,
+}
+FORMATS = ("ndjson", "csv")
+BATCH_SIZE = 1000
+
+# String columns that only hold the values of an enum
+ENUM_COLUMNS = {Score.__table__.c.mode: GameMode}
+
+
+def get_table(name: str) -> Table:
+    if name not in TABLES:
+        raise ValueError(f"Unknown table '{name}', expected one of: {', '.join(TABLES)}")
+    return TABLES[name]
+
+
+def _check_format(fmt: str) -> None:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+
+
+# ---- Export ----
+
+def _to_json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_rows(connection: Connection, table: Table, fmt: str, batch_size: int = BATCH_SIZE) -> Iterator[str]:
+    """Yield the table as NDJSON or CSV text, one chunk per batch of rows."""
+    _check_format(fmt)
+    columns = [column.name for column in table.columns]
+    # Primary key order makes exports deterministic and imports resumable
+    result = connection.execution_options(yield_per=batch_size).execute(
+        select(table).order_by(*table.primary_key.columns)
+    )
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+    for rows in result.partitions():
+        if fmt == "ndjson":
+            yield "".join(
+                json.dumps({name: _to_json_value(value) for name, value in zip(columns, row)}) + "\n"
+                for row in rows
+            )
+        else:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                ["" if value is None else _to_json_value(value) for value in row] for row in rows
+            )
+            yield buffer.getvalue()
+
+
+# ---- Import ----
+
+def _require(kind: type, name: str) -> Callable:
+    def check(value):
+        # bool is an int subclass, but `true` is no score
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise ValueError(f"expected {name}, got {value!r}")
+        return value
+    return check
+
+
+def _converter(column, fmt: str) -> Callable:
+    """Parser turning an exported value back into what the column stores; raises ValueError if it can't."""
+    if isinstance(column.type, DateTime):
+        parse = datetime.fromisoformat
+    elif isinstance(column.type, Integer):
+        parse = int if fmt == "csv" else _require(int, "an integer")
+    elif column in ENUM_COLUMNS:
+        enum = ENUM_COLUMNS[column]
+        parse = lambda value: enum(value).value
+    elif isinstance(column.type, String):
+        parse = _require(str, "a string")
+    else:
+        parse = None
+    # CSV has no null: an empty cell means None for nullable columns
+    null_csv = fmt == "csv" and column.nullable
+
+    def convert(value):
+        if value is None or (null_csv and value == ""):
+            return None
+        if not parse:
+            return value
+        try:
+            return parse(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{column.name}: {e}") from None
+    return convert
+
+
+def parse_records(table: Table, fmt: str, lines: Iterable[str], skip: int = 0) -> Iterator[dict]:
+    """Parse exported text into insertable dicts, skipping the first `skip` records unparsed."""
+    _check_format(fmt)
+    converters = {column.name: _converter(column, fmt) for column in table.columns}
+    if fmt == "ndjson":
+        raw = itertools.islice((line for line in lines if line.strip()), skip, None)
+        raw = (json.loads(line) for line in raw)
+    else:
+        raw = itertools.islice(csv.DictReader(lines), skip, None)
+
+    for record in raw:
+        if not isinstance(record, dict):
+            raise ValueError(f"expected a JSON object, got {record!r}")
+        yield {name: converters[name](record[name]) for name in converters if name in record}
+
+
+class Checkpoint:
+    """Number of records already committed by an import, stored as JSON next to the source."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+
+    def load(self) -> int:
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            return json.load(f)["records"]
+
+    def save(self, records: int) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"records": records}, f)
+        # Atomic swap so a crash never leaves a half-written checkpoint
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def import_rows(
+    connection: Connection,
+    table: Table,
+    fmt: str,
+    lines: Iterable[str],
+    batch_size: int = BATCH_SIZE,
+    skip: int = 0,
+    on_commit: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Insert records from `lines`, committing every `batch_size` records.
+    Each commit also bumps the shared cache generation, so a running server
+    picks up rows imported from another process.
+
+    The first `skip` records are assumed to be already imported. `on_commit`
+    is called with the total number of records handled after each commit.
+    Returns the number of records inserted by this call.
+    """
+    records = skip
+    imported = 0
+    batch = []
+
+    def flush():
+        nonlocal imported
+        connection.execute(table.insert(), batch)
+        leaderboard_cache.mark_changed(connection)
+        connection.commit()
+        imported += len(batch)
+        batch.clear()
+        if on_commit:
+            on_commit(records)
+
+    for record in parse_records(table, fmt, lines, skip):
+        batch.append(record)
+        records += 1
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return imported
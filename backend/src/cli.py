@@ -0,0 +1,81 @@
+"""
+Command line maintenance tasks. Run from the backend directory:
+
+    uv run python -m src.cli export scores --format csv -o scores.csv
+    uv run python -m src.cli import scores scores.csv --format csv --checkpoint scores.ckpt
+    uv run python -m src.cli archive --horizon-days 180
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy.orm import Session
+
+from .db.database import engine
+from .bulk import TABLES, FORMATS, BATCH_SIZE, Checkpoint, get_table, export_rows, import_rows
+from .archive import ARCHIVE_HORIZON_DAYS, archive_scores
+
+
+def export_command(args) -> None:
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        with engine.connect() as connection:
+            for chunk in export_rows(connection, get_table(args.table), args.format, args.batch_size):
+                out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def import_command(args) -> None:
+    checkpoint = Checkpoint(args.checkpoint)
+    skip = checkpoint.load()
+    if skip:
+        print(f"Resuming after {skip} records", file=sys.stderr)
+
+    with open(args.input, newline="", encoding="utf-8") as f, engine.connect() as connection:
+        imported = import_rows(
+            connection, get_table(args.table), args.format, f,
+            batch_size=args.batch_size, skip=skip, on_commit=checkpoint.save,
+        )
+
+    checkpoint.clear()
+    print(f"Imported {imported} records into {args.table}", file=sys.stderr)
+
+
+def archive_command(args) -> None:
+    with Session(engine) as db:
+        report = archive_scores(db, horizon_days=args.horizon_days, batch_size=args.batch_size)
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Snake backend maintenance tasks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Stream a table to NDJSON/CSV")
+    export.add_argument("table", choices=list(TABLES))
+    export.add_argument("--format", choices=FORMATS, default="ndjson")
+    export.add_argument("-o", "--output", help="Output file (default: stdout)")
+    export.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    export.set_defaults(handler=export_command)
+
+    imp = commands.add_parser("import", help="Bulk load a table from an NDJSON/CSV export")
+    imp.add_argument("table", choices=list(TABLES))
+    imp.add_argument("input")
+    imp.add_argument("--format", choices=FORMATS, default="ndjson")
+    imp.add_argument("--checkpoint", help="Progress file; an interrupted import resumes from it")
+    imp.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    imp.set_defaults(handler=import_command)
+
+    archive = commands.add_parser("archive", help="Move old scores into monthly archive tables")
+    archive.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS)
+    archive.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    archive.set_defaults(handler=archive_command)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
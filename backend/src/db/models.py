@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime, timezone
@@ -27,6 +27,31 @@ class Score(Base):
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     score = Column(Integer, nullable=False)
     mode = Column(String, nullable=False)  # Storing Enum as string
-    played_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Indexed for archival, which walks scores in played_at order
+    played_at = Column(DateTime, index=True, default=lambda: datetime.now(timezone.utc))
 
     user = relationship("User", back_populates="scores")
+
+class ScoreSketch(Base):
+    """Persisted score histogram, see src/stats.py"""
+    __tablename__ = "score_sketches"
+
+    key = Column(String, primary_key=True)
+    data = Column(Text, nullable=False)  # JSON-encoded ScoreHistogram
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class CacheGeneration(Base):
+    """Single row counting out-of-band writes to `scores`, see src/leaderboard_cache.py"""
+    __tablename__ = "cache_generation"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+class ScoreAggregate(Base):
+    """Per-user/per-mode summary of scores moved to archive tables, see src/archive.py"""
+    __tablename__ = "score_aggregates"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    mode = Column(String, primary_key=True)
+    archived_games = Column(Integer, nullable=False, default=0)
+    histogram = Column(Text, nullable=False)  # JSON-encoded ScoreHistogram of the archived scores
@@ -0,0 +1,137 @@
+"""
+Versioned leaderboard cache and change feed.
+
+Every `GameMode` has a monotonically increasing version that `submit_score`
+bumps. The board for a mode (or for all modes, keyed by `None`) is cached
+together with the version it was computed at, and the version doubles as the
+ETag for conditional GETs. Subscribers (the SSE stream) receive only the ranks
+that changed when a new score enters the top `LEADERBOARD_SIZE`.
+
+Versions are per process; the epoch in the ETag only keeps a restarted
+process from matching ETags issued before the restart. Writes made outside
+`submit_score` (imports, also from the CLI) bump the shared
+`cache_generation` row, which every process checks in `sync`. Archival
+changes no cached view and bumps nothing. Score
+submissions do not: with several workers, a worker that didn't accept a
+score keeps serving its cached board under an unchanged ETag. Run a single
+worker (as the Dockerfile does) unless versions move to shared storage.
+"""
+import asyncio
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select, update
+
+from .db.models import CacheGeneration
+from .models import GameMode, LeaderboardEntry
+
+LEADERBOARD_SIZE = 50
+SUBSCRIBER_QUEUE_SIZE = 64
+
+# Sent to a subscriber that fell behind; it should refetch the full board
+RESYNC = object()
+
+
+class LeaderboardCache:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.epoch = uuid.uuid4().hex[:8]
+        self.generation: Optional[int] = None
+        # Counts `invalidate` calls, for caches that follow submissions themselves
+        self.invalidations = 0
+        self._versions: Dict[GameMode, int] = {mode: 0 for mode in GameMode}
+        self._boards: Dict[Optional[GameMode], Tuple[int, List[LeaderboardEntry]]] = {}
+        self._subscribers: Dict[Optional[GameMode], Set[asyncio.Queue]] = {}
+
+    def version(self, mode: Optional[GameMode]) -> int:
+        if mode is None:
+            # Sum of monotonic counters is itself monotonic
+            return sum(self._versions.values())
+        return self._versions[mode]
+
+    def etag(self, mode: Optional[GameMode]) -> str:
+        return f'W/"{self.epoch}-{mode.value if mode else "all"}-{self.version(mode)}"'
+
+    def get(self, mode: Optional[GameMode]) -> Optional[List[LeaderboardEntry]]:
+        cached = self._boards.get(mode)
+        if cached and cached[0] == self.version(mode):
+            return cached[1]
+        return None
+
+    def store(self, mode: Optional[GameMode], entries: List[LeaderboardEntry]) -> None:
+        self._boards[mode] = (self.version(mode), entries)
+
+    def bump(self, mode: GameMode) -> None:
+        self._versions[mode] += 1
+
+    def invalidate(self) -> None:
+        """Drop every cached board and tell subscribers to resync (see `mark_changed`)."""
+        self.invalidations += 1
+        for mode in GameMode:
+            self.bump(mode)
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._resync(queue)
+
+    # ---- Writes from other processes ----
+
+    def sync(self, db) -> None:
+        """Invalidate if `scores` was changed out of band (e.g. a CLI import) since we last looked."""
+        generation = db.execute(select(CacheGeneration.generation)).scalar() or 0
+        if self.generation is not None and generation != self.generation:
+            self.invalidate()
+        self.generation = generation
+
+    def mark_changed(self, db) -> None:
+        """
+        Record an out-of-band write to `scores` in the database, as part of the
+        caller's transaction. Every process, this one included, invalidates on
+        its next `sync`.
+        """
+        result = db.execute(update(CacheGeneration).values(generation=CacheGeneration.generation + 1))
+        if not result.rowcount:
+            db.execute(insert(CacheGeneration).values(id=1, generation=1))
+
+    # ---- Change feed ----
+
+    def subscribe(self, mode: Optional[GameMode]) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(mode, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, mode: Optional[GameMode], queue: asyncio.Queue) -> None:
+        self._subscribers.get(mode, set()).discard(queue)
+
+    def has_subscribers(self) -> bool:
+        return any(self._subscribers.values())
+
+    def publish(self, mode: Optional[GameMode], old: List[LeaderboardEntry], new: List[LeaderboardEntry]) -> None:
+        changed = [
+            entry for i, entry in enumerate(new)
+            if i >= len(old) or old[i].id != entry.id
+        ]
+        if not changed:
+            return
+
+        event = {
+            "mode": mode.value if mode else None,
+            "version": self.version(mode),
+            "entries": [entry.model_dump(mode="json") for entry in changed],
+        }
+        for queue in self._subscribers.get(mode, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._resync(queue)
+
+    @staticmethod
+    def _resync(queue: asyncio.Queue) -> None:
+        # Drop whatever is pending; the client will refetch the whole board
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+
+
+leaderboard_cache = LeaderboardCache()
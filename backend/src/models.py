@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
@@ -59,12 +59,56 @@ class SignupCredentials(BaseModel):
     password: str
 
 class LeaderboardEntry(BaseModel):
+    """A score and its position on the leaderboard (0 if it isn't on it)"""
     id: str
     rank: int
     username: str
     score: int
     mode: GameMode
     playedAt: datetime
+    # Only set by `submit_score`: where the score places against every
+    # player's best (as in `PlayerRank`), None while that index is rebuilt
+    playerRank: Optional[int] = None
+
+class PlayerRank(BaseModel):
+    """A player's best score and its rank against every other player's best"""
+    id: str
+    playerRank: int
+    username: str
+    score: int
+    mode: GameMode
+    playedAt: datetime
+
+class LeaderboardSlice(BaseModel):
+    """A player's rank among players' bests and the players ranked around it"""
+    playerRank: int
+    entries: List[PlayerRank]
+
+class HistogramBin(BaseModel):
+    low: int
+    high: int
+    count: int
+
+class PlayerStats(BaseModel):
+    """Score distribution of one player in one mode (approximate, see src/stats.py)"""
+    username: str
+    mode: GameMode
+    games: int
+    best: int
+    mean: float
+    percentiles: Dict[str, int]
+    histogram: List[HistogramBin]
+    beatsPercent: float  # share of players whose best score is lower
+
+class ModeStats(BaseModel):
+    mode: GameMode
+    games: int
+    players: int
+    mean: Optional[float] = None
+    percentiles: Dict[str, int]
+    histogram: List[HistogramBin]
+    bestPercentiles: Dict[str, int]  # over each player's best score
+    beatsPercent: Optional[float] = None  # for the `score` query parameter
 
 class GameState(BaseModel):
     snake: List[Position]
@@ -74,6 +118,8 @@ class GameState(BaseModel):
     status: GameStatus
     mode: GameMode
     speed: int
+    # Board width/height in cells; the frontend's own games use 20
+    gridSize: int = 20
 
 class ActivePlayer(BaseModel):
     id: str
@@ -0,0 +1,336 @@
+"""
+In-memory order-statistic index of players' best scores for rank lookups.
+
+Counting the rows above a player (or paging with OFFSET) costs O(table size)
+per request. Instead every board (one per `GameMode`, plus `None` for all
+modes) is kept as an `OrderStatisticList` of each player's best score, which
+answers "what rank is this score" and "who sits at ranks i..j" in logarithmic
+time. Only bests are ranked, so memory grows with players rather than games,
+and archival (which never moves a best, see src/archive.py) leaves ranks as
+they were.
+
+The index is built by one query in a worker thread, never on the event loop,
+and then updated by `submit_score`. Scores submitted while a build runs are
+replayed onto its result. Any other change to `scores` (imports, also from
+the CLI) invalidates `leaderboard_cache`, and the index rebuilds on its next
+use.
+"""
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .db.models import Score, User as DBUser
+from .models import GameMode, PlayerRank
+from .leaderboard_cache import leaderboard_cache
+
+# (-score, played_at, id): ascending order == leaderboard order
+RankKey = Tuple[int, datetime, str]
+
+BUILD_BATCH_SIZE = 10_000
+
+# Keys of one build: boards, each player's best per board, rows behind the keys
+Snapshot = Tuple[dict, dict, dict]
+
+
+class OrderStatisticList:
+    """
+    Sorted list stored as buckets of roughly `load` keys, with a Fenwick tree
+    over bucket sizes so positions can be found without walking every bucket.
+    """
+
+    def __init__(self, keys=(), load: int = 512):
+        self._load = load
+        keys = sorted(keys)
+        self._buckets: List[list] = [keys[i:i + load] for i in range(0, len(keys), load)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+        self._rebuild_tree()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket: int, delta: int) -> None:
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket: int) -> int:
+        """Number of keys in buckets before `bucket`."""
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """(bucket, offset) holding the key at `position`."""
+        bucket, step = 0, 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = bucket + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                bucket = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return bucket, position
+
+    def add(self, key) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._rebuild_tree()
+            return
+
+        i = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+
+        if len(bucket) > 2 * self._load:
+            # Split; rebuilding the tree is O(buckets) but happens once per `load` inserts
+            self._buckets[i:i + 1] = [bucket[:self._load], bucket[self._load:]]
+            self._maxes[i:i + 1] = [bucket[self._load - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key) -> None:
+        """Remove `key`, which must be present."""
+        position = self.index(key)
+        i, offset = self._locate(position)
+        bucket = self._buckets[i]
+        del bucket[offset]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+
+    def bisect_left(self, key) -> int:
+        """Number of keys lower than `key`."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            return self._len
+        return self._prefix(i) + bisect_left(self._buckets[i], key)
+
+    def index(self, key) -> int:
+        """Position of `key`, which must be present."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            raise ValueError(f"{key!r} is not in list")
+        offset = bisect_left(self._buckets[i], key)
+        if offset == len(self._buckets[i]) or self._buckets[i][offset] != key:
+            raise ValueError(f"{key!r} is not in list")
+        return self._prefix(i) + offset
+
+    def islice(self, start: int, stop: int) -> Iterator:
+        start, stop = max(0, start), min(self._len, stop)
+        if start >= stop:
+            return
+        bucket, offset = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._buckets[bucket][offset:offset + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            bucket, offset = bucket + 1, 0
+
+
+def _naive(value: Optional[datetime]) -> datetime:
+    # SQLite hands back naive datetimes while fresh ORM objects are UTC-aware;
+    # compare everything as naive UTC
+    if value is None:
+        return datetime.min
+    return value.replace(tzinfo=None)
+
+
+def rank_key(score: int, played_at: Optional[datetime], score_id: str) -> RankKey:
+    return (-score, _naive(played_at), score_id)
+
+
+class RankIndex:
+    def __init__(self):
+        self._built_for = None
+        self._boards: Dict[Optional[GameMode], OrderStatisticList] = {}
+        # (board, username) -> that user's best key on the board
+        self._best: Dict[Tuple[Optional[GameMode], str], RankKey] = {}
+        # score id -> (username, mode, played_at) for building entries
+        self._rows: Dict[str, Tuple[str, GameMode, Optional[datetime]]] = {}
+        # Scores submitted while a build is running, replayed onto its result
+        self._pending: Optional[list] = None
+        # `_lock` guards the structures (held briefly, also on the event loop);
+        # `_build_lock` lets only one build run at a time
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _state(self):
+        # Submissions are applied incrementally, so only invalidations matter
+        return (leaderboard_cache.epoch, leaderboard_cache.invalidations)
+
+    def is_current(self) -> bool:
+        return self._built_for == self._state()
+
+    # ---- Building ----
+
+    def rebuild(self, bind) -> None:
+        """Rebuild if stale. Blocks for a full query, so call it from a worker thread."""
+        with self._build_lock:
+            if self.is_current():
+                return
+            state = self._state()
+            with self._lock:
+                self._pending = []
+            try:
+                boards, best, rows = self._load(bind)
+            finally:
+                with self._lock:
+                    pending, self._pending = self._pending, None
+            with self._lock:
+                self._boards, self._best, self._rows = boards, best, rows
+                for args in pending:
+                    self._apply(*args)
+                # If an invalidation happened meanwhile this stays stale
+                self._built_for = state
+
+    @staticmethod
+    def _load(bind) -> Snapshot:
+        ranked = (
+            select(
+                Score.id, Score.score, Score.mode, Score.played_at, DBUser.username,
+                func.row_number().over(
+                    partition_by=(Score.user_id, Score.mode),
+                    order_by=(Score.score.desc(), Score.played_at.asc(), Score.id.asc()),
+                ).label("position"),
+            )
+            .join(DBUser)
+            .subquery()
+        )
+        best_per_mode = select(
+            ranked.c.id, ranked.c.score, ranked.c.mode, ranked.c.played_at, ranked.c.username
+        ).where(ranked.c.position == 1)
+
+        best: Dict[Tuple[Optional[GameMode], str], RankKey] = {}
+        rows = {}
+        with Session(bind) as db:
+            for score_id, score, mode, played_at, username in db.execute(
+                best_per_mode.execution_options(yield_per=BUILD_BATCH_SIZE)
+            ):
+                mode = GameMode(mode) if mode else GameMode.PASS_THROUGH
+                key = rank_key(score, played_at, score_id)
+                rows[score_id] = (username, mode, played_at)
+                best[(mode, username)] = key
+                overall = best.get((None, username))
+                if overall is None or key < overall:
+                    best[(None, username)] = key
+
+        keys: Dict[Optional[GameMode], list] = {mode: [] for mode in GameMode}
+        keys[None] = []
+        for (board, _), key in best.items():
+            keys[board].append(key)
+        boards = {board: OrderStatisticList(board_keys) for board, board_keys in keys.items()}
+        return boards, best, rows
+
+    async def ensure(self, db: Session) -> None:
+        leaderboard_cache.sync(db)
+        if not self.is_current():
+            await run_in_threadpool(self.rebuild, db.get_bind())
+
+    # ---- Updates ----
+
+    def _apply(self, key: RankKey, username: str, mode: GameMode, played_at: Optional[datetime]) -> None:
+        replaced = []
+        for board in (mode, None):
+            best = self._best.get((board, username))
+            if best is not None and best <= key:
+                continue
+            if best is not None:
+                self._boards[board].remove(best)
+                replaced.append(best)
+            self._boards[board].add(key)
+            self._best[(board, username)] = key
+        if not replaced and self._best.get((mode, username)) != key:
+            return
+        self._rows[key[2]] = (username, mode, played_at)
+        # A replaced overall best can still be the best in its own mode
+        still_used = {self._best.get((board, username)) for board in self._boards}
+        for old in replaced:
+            if old not in still_used:
+                self._rows.pop(old[2], None)
+
+    def add(self, score: Score, username: str) -> None:
+        """
+        Record a score that was just committed. Dropped if the index is stale
+        and not being built: the next build reads it from the table.
+        """
+        mode = GameMode(score.mode)
+        args = (rank_key(score.score, score.played_at, score.id), username, mode, score.played_at)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(args)
+            elif self.is_current():
+                self._apply(*args)
+
+    # ---- Queries ----
+
+    def rank(self, mode: Optional[GameMode], score: Score, username: str) -> Optional[int]:
+        """
+        Rank `score` would have against every other player's best, or None if
+        the index is stale. Never builds, so it is cheap on the submit path.
+        """
+        key = rank_key(score.score, score.played_at, score.id)
+        with self._lock:
+            if not self.is_current():
+                return None
+            position = self._boards[mode].bisect_left(key)
+            own = self._best.get((mode, username))
+        # Don't count the player's own (better) best
+        if own is not None and own < key:
+            position -= 1
+        return position + 1
+
+    async def around(self, db: Session, mode: Optional[GameMode], username: str, radius: int) -> Optional[Tuple[int, List[PlayerRank]]]:
+        """The user's best rank and the players within `radius` ranks of it, or None if they have no score."""
+        await self.ensure(db)
+        with self._lock:
+            best = self._best.get((mode, username))
+            if best is None:
+                return None
+
+            board = self._boards[mode]
+            position = board.index(best)
+            start = max(0, position - radius)
+            keys = list(board.islice(start, position + radius + 1))
+            rows = [self._rows[key[2]] for key in keys]
+
+        entries = []
+        for offset, (key, (row_username, row_mode, played_at)) in enumerate(zip(keys, rows)):
+            entries.append(PlayerRank(
+                id=key[2],
+                playerRank=start + offset + 1,
+                username=row_username,
+                score=-key[0],
+                mode=row_mode,
+                playedAt=played_at
+            ))
+        return position + 1, entries
+
+
+rank_index = RankIndex()
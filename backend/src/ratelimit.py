@@ -0,0 +1,247 @@
+"""
+In-memory rate limiting and admission control.
+
+Routers declare their own limits with `RateLimiter` and attach them as
+dependencies; `ConcurrencyLimitMiddleware` caps in-flight requests for the
+whole app. Buckets refill lazily when they are touched, so there is no
+background sweeper. Multi-worker deployments can share buckets by passing a
+different `RateLimitBackend` to `set_backend`.
+
+Clients are identified by the connecting address. `X-Forwarded-For` is only
+consulted when that address is one of `TRUSTED_PROXIES`, otherwise anyone
+could pick a fresh IP per request. Behind a proxy (such as the bundled
+frontend/nginx.conf) it must be set, or all clients share the proxy's limits.
+"""
+import ipaddress
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "256"))
+
+
+def parse_networks(value: str) -> List[ipaddress._BaseNetwork]:
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+# Comma-separated addresses/CIDRs of reverse proxies allowed to set X-Forwarded-For
+TRUSTED_PROXIES = parse_networks(os.getenv("TRUSTED_PROXIES", ""))
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Allow `requests` per `per_seconds`, with bursts up to `burst` (defaults to `requests`)."""
+    requests: int
+    per_seconds: float
+    burst: Optional[int] = None
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.per_seconds
+
+    @property
+    def capacity(self) -> int:
+        return self.burst if self.burst is not None else self.requests
+
+
+class RateLimitBackend(ABC):
+    """Storage for token buckets. Subclass to share buckets between workers (e.g. Redis)."""
+
+    @abstractmethod
+    def consume(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Take `cost` tokens from `key`. Returns 0 when allowed, otherwise seconds until retry."""
+
+    @abstractmethod
+    def reset(self) -> None:
+        ...
+
+
+class InMemoryBackend(RateLimitBackend):
+    """
+    Sharded dict of `key -> [tokens, last_refill, rate, capacity]` guarded by
+    one lock per shard. Buckets carry their own limit because a shard mixes
+    keys from every `RateLimiter`.
+    """
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10_000, clock: Callable[[], float] = time.monotonic):
+        self._shards = [dict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._max_keys = max_keys_per_shard
+        self._clock = clock
+
+    def consume(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        index = hash(key) % len(self._shards)
+        shard = self._shards[index]
+        now = self._clock()
+        rate, capacity = limit.rate, limit.capacity
+
+        with self._locks[index]:
+            bucket = shard.get(key)
+            if bucket is None:
+                if len(shard) >= self._max_keys:
+                    self._evict(shard, now)
+                bucket = shard[key] = [float(capacity), now, rate, capacity]
+            else:
+                # Lazy refill: credit tokens for the time since the last touch
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / rate
+
+    def _evict(self, shard: dict, now: float) -> None:
+        # A bucket that would be full again behaves exactly like a missing one,
+        # so dropping it is invisible to callers and keeps memory bounded.
+        for key, (tokens, last, rate, capacity) in list(shard.items()):
+            if tokens + (now - last) * rate >= capacity:
+                del shard[key]
+        if len(shard) >= self._max_keys:
+            # Still crowded (e.g. under attack): fall back to dropping the oldest entries.
+            oldest = sorted(shard.items(), key=lambda item: item[1][1])[: len(shard) // 4 or 1]
+            for key, _ in oldest:
+                del shard[key]
+
+    def reset(self) -> None:
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                shard.clear()
+
+
+_backend: RateLimitBackend = InMemoryBackend()
+
+
+def get_backend() -> RateLimitBackend:
+    return _backend
+
+
+def set_backend(backend: RateLimitBackend) -> None:
+    global _backend
+    _backend = backend
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted(peer):
+        return peer
+
+    # Each proxy appends the address it received from, so walk right to left
+    # past our own proxies; the first other hop is the client as far as we can tell
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+class RateLimiter:
+    """
+    FastAPI dependency enforcing per-IP and per-user token buckets for one route.
+
+    `user_field` names the JSON body field that identifies the user (e.g. the
+    login email); it is read from the body FastAPI has already parsed. With
+    `user_per_ip` the per-user bucket is keyed on (client IP, user), so
+    requests from elsewhere cannot use up someone else's allowance.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_ip: Optional[Limit] = None,
+        per_user: Optional[Limit] = None,
+        user_field: Optional[str] = None,
+        user_per_ip: bool = False,
+    ):
+        self.name = name
+        self.per_ip = per_ip
+        self.per_user = per_user
+        self.user_field = user_field
+        self.user_per_ip = user_per_ip
+
+    async def __call__(self, request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+
+        backend = get_backend()
+        ip = client_ip(request)
+        if self.per_ip:
+            retry_after = backend.consume(f"{self.name}:ip:{ip}", self.per_ip)
+            if retry_after:
+                _reject(retry_after)
+
+        if self.per_user and self.user_field:
+            user = await self._user_key(request)
+            if user:
+                if self.user_per_ip:
+                    user = f"{ip}:{user}"
+                retry_after = backend.consume(f"{self.name}:user:{user}", self.per_user)
+                if retry_after:
+                    _reject(retry_after)
+
+    async def _user_key(self, request: Request) -> Optional[str]:
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        value = body.get(self.user_field) if isinstance(body, dict) else None
+        return str(value).lower() if value is not None else None
+
+
+def _reject(retry_after: float) -> None:
+    raise HTTPException(
+        status_code=429,
+        detail="Too many requests",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Rejects HTTP requests with 503 once `max_concurrent` are already in flight,
+    instead of letting them queue behind a saturated worker.
+    """
+
+    def __init__(self, app: ASGIApp, max_concurrent: int = MAX_CONCURRENT_REQUESTS, exempt_paths: tuple = ()):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.exempt_paths = exempt_paths
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight >= self.max_concurrent:
+            response = JSONResponse(
+                {"detail": "Server busy, try again later"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        # Single-threaded event loop: no lock needed around the counter
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
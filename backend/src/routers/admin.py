@@ -0,0 +1,103 @@
+import io
+import tempfile
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..db.database import get_db
+from ..models import ApiResponse
+from ..security import require_admin_token
+from ..bulk import get_table, export_rows, import_rows
+from ..archive import ARCHIVE_HORIZON_DAYS, archive_scores
+from ..leaderboard_cache import leaderboard_cache
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Request bodies above this size are spooled to disk while importing
+IMPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
+def lookup_table(table: str):
+    try:
+        return get_table(table)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/export/{table}")
+async def export_table(table: str, format: Literal["ndjson", "csv"] = "ndjson", db: Session = Depends(get_db)):
+    sql_table = lookup_table(table)
+    # Own connection: the response streams after the request's session is done with
+    engine = db.get_bind()
+
+    def stream():
+        with engine.connect() as connection:
+            yield from export_rows(connection, sql_table, format)
+
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
+
+@router.post("/import/{table}", response_model=ApiResponse)
+async def import_table(
+    table: str,
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    skip: int = 0,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk insert an export file sent as the request body. On failure the
+    response says how many records were committed; send the same file again
+    with `skip` set to that number to resume.
+    """
+    sql_table = lookup_table(table)
+    leaderboard_cache.sync(db)
+
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        committed = skip
+        def on_commit(records):
+            nonlocal committed
+            committed = records
+
+        lines = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+
+        def run_import():
+            with db.get_bind().connect() as connection:
+                return import_rows(connection, sql_table, format, lines, skip=skip, on_commit=on_commit)
+
+        try:
+            # Bulk inserts block; keep them off the event loop
+            imported = await run_in_threadpool(run_import)
+        except (ValueError, KeyError, IntegrityError) as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Import stopped after {committed} records: {getattr(e, 'orig', None) or e}"
+            )
+        finally:
+            # Batches commit as they go, so even a failed import may have changed the board
+            leaderboard_cache.sync(db)
+
+    return ApiResponse(success=True, data={"imported": imported, "records": committed})
+
+@router.post("/archive", response_model=ApiResponse)
+async def archive_old_scores(
+    horizon_days: int = Query(ARCHIVE_HORIZON_DAYS, ge=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Move scores older than `horizon_days` into the monthly archive tables,
+    keeping every player's best and the top of each board hot. The report
+    compares row count, size and query latency of `scores` before and after.
+    """
+    # The job blocks for as long as it runs; keep it off the event loop
+    report = await run_in_threadpool(archive_scores, db, horizon_days=horizon_days)
+    return ApiResponse(success=True, data=report.to_dict())
@@ -4,9 +4,14 @@ from ..db.database import get_db
 from ..db.models import User as DBUser
 from ..models import LoginCredentials, SignupCredentials, User, ApiResponse
 from ..security import verify_password, get_password_hash
+from ..ratelimit import RateLimiter, Limit
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+# Rate limits - bcrypt makes these the most expensive endpoints we serve
+login_limit = RateLimiter("auth.login", per_ip=Limit(20, 60), per_user=Limit(5, 60), user_field="email", user_per_ip=True)
+signup_limit = RateLimiter("auth.signup", per_ip=Limit(10, 60))
+
 def to_pydantic_user(db_user: DBUser) -> User:
     return User(
         id=str(db_user.id),
@@ -16,7 +21,7 @@ def to_pydantic_user(db_user: DBUser) -> User:
         createdAt=db_user.created_at
     )
 
-@router.post("/login", response_model=ApiResponse)
+@router.post("/login", response_model=ApiResponse, dependencies=[Depends(login_limit)])
 async def login(credentials: LoginCredentials, db: Session = Depends(get_db)):
     user_in_db = db.query(DBUser).filter(DBUser.email == credentials.email).first()
     
@@ -30,7 +35,7 @@ async def login(credentials: LoginCredentials, db: Session = Depends(get_db)):
     
     return ApiResponse(success=True, data=to_pydantic_user(user_in_db))
 
-@router.post("/signup", response_model=ApiResponse)
+@router.post("/signup", response_model=ApiResponse, dependencies=[Depends(signup_limit)])
 async def signup(credentials: SignupCredentials, db: Session = Depends(get_db)):
     if db.query(DBUser).filter(DBUser.email == credentials.email).first():
         raise HTTPException(status_code=400, detail="Email already registered")
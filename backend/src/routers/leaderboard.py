@@ -1,22 +1,35 @@
-from typing import Optional, List
-from fastapi import APIRouter, Body, Depends, HTTPException
+import asyncio
+import json
+from bisect import bisect_left
+from typing import Optional, List, Tuple
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from ..db.database import get_db
 from ..db.models import Score, User as DBUser
-from ..models import ApiResponse, LeaderboardEntry, GameMode
+from ..models import ApiResponse, LeaderboardEntry, LeaderboardSlice, GameMode
+from ..ratelimit import RateLimiter, Limit
+from ..leaderboard_cache import leaderboard_cache, LEADERBOARD_SIZE, RESYNC
+from ..ranking import rank_index, rank_key
+from ..stats import score_stats
 
 router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 
-@router.get("/", response_model=ApiResponse)
-async def get_leaderboard(mode: Optional[GameMode] = None, db: Session = Depends(get_db)):
+# Rate limits
+submit_score_limit = RateLimiter("leaderboard.submit", per_ip=Limit(60, 60), per_user=Limit(30, 60), user_field="username")
+
+# Seconds between SSE keep-alive comments (stops proxies closing idle streams)
+STREAM_KEEPALIVE = 15
+
+def compute_leaderboard(db: Session, mode: Optional[GameMode]) -> List[LeaderboardEntry]:
     query = db.query(Score).join(DBUser)
-    
+
     if mode:
         query = query.filter(Score.mode == mode.value)
-        
-    # Get top 50 scores
-    scores = query.order_by(Score.score.desc()).limit(50).all()
-    
+
+    # Get top scores; ties go to whoever got there first
+    scores = query.order_by(Score.score.desc(), Score.played_at.asc(), Score.id.asc()).limit(LEADERBOARD_SIZE).all()
+
     entries_with_rank = []
     for i, s in enumerate(scores):
         entries_with_rank.append(LeaderboardEntry(
@@ -27,41 +40,159 @@ async def get_leaderboard(mode: Optional[GameMode] = None, db: Session = Depends
             mode=GameMode(s.mode) if s.mode else GameMode.PASS_THROUGH,
             playedAt=s.played_at
         ))
-        
-    return ApiResponse(success=True, data=entries_with_rank)
 
-@router.post("/", response_model=ApiResponse)
+    return entries_with_rank
+
+def with_entry(board: List[LeaderboardEntry], entry: LeaderboardEntry) -> Tuple[List[LeaderboardEntry], int]:
+    """`board` after `entry` was scored, and the entry's rank on it (0 if it didn't make it)."""
+    key = rank_key(entry.score, entry.playedAt, entry.id)
+    position = bisect_left([rank_key(e.score, e.playedAt, e.id) for e in board], key)
+    if position >= LEADERBOARD_SIZE:
+        return board, 0
+    moved = [e.model_copy(update={"rank": e.rank + 1}) for e in board[position:LEADERBOARD_SIZE - 1]]
+    return board[:position] + [entry.model_copy(update={"rank": position + 1})] + moved, position + 1
+
+def get_cached_leaderboard(db: Session, mode: Optional[GameMode]) -> List[LeaderboardEntry]:
+    entries = leaderboard_cache.get(mode)
+    if entries is None:
+        entries = compute_leaderboard(db, mode)
+        leaderboard_cache.store(mode, entries)
+    return entries
+
+@router.get("/", response_model=ApiResponse)
+async def get_leaderboard(
+    request: Request,
+    response: Response,
+    mode: Optional[GameMode] = None,
+    db: Session = Depends(get_db)
+):
+    leaderboard_cache.sync(db)
+    etag = leaderboard_cache.etag(mode)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return ApiResponse(success=True, data=get_cached_leaderboard(db, mode))
+
+@router.get("/stream")
+async def stream_leaderboard(request: Request, mode: Optional[GameMode] = None, db: Session = Depends(get_db)):
+    """
+    Server-Sent Events feed. Starts with a `snapshot` of the board, then sends
+    `ranks` events holding only the entries whose rank changed. A `resync`
+    event means updates were dropped and the board should be refetched.
+    The stream itself never touches the database.
+    """
+    leaderboard_cache.sync(db)
+    snapshot = {
+        "mode": mode.value if mode else None,
+        "version": leaderboard_cache.version(mode),
+        "entries": [e.model_dump(mode="json") for e in get_cached_leaderboard(db, mode)],
+    }
+    queue = leaderboard_cache.subscribe(mode)
+    # get_db only closes the session once the response ends; hand the
+    # connection back now so open streams don't drain the pool
+    db.close()
+
+    async def event_stream():
+        try:
+            yield format_event("snapshot", snapshot)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if event is RESYNC:
+                    yield format_event("resync", {"mode": snapshot["mode"]})
+                else:
+                    yield format_event("ranks", event)
+        finally:
+            leaderboard_cache.unsubscribe(mode, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/around/{username}", response_model=ApiResponse)
+async def get_leaderboard_around(
+    username: str,
+    mode: Optional[GameMode] = None,
+    radius: int = Query(5, ge=0, le=LEADERBOARD_SIZE),
+    db: Session = Depends(get_db)
+):
+    result = await rank_index.around(db, mode, username, radius)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No scores for this user")
+
+    rank, entries = result
+    return ApiResponse(success=True, data=LeaderboardSlice(playerRank=rank, entries=entries))
+
+def format_event(event: str, data: dict) -> str:
+    event_id = f"id: {data['version']}\n" if "version" in data else ""
+    return f"event: {event}\n{event_id}data: {json.dumps(data)}\n\n"
+
+@router.post("/", response_model=ApiResponse, dependencies=[Depends(submit_score_limit)])
 async def submit_score(
-    score: int = Body(...), 
-    mode: GameMode = Body(...), 
+    background_tasks: BackgroundTasks,
+    score: int = Body(...),
+    mode: GameMode = Body(...),
     username: str = Body(...),
     db: Session = Depends(get_db)
 ):
+    """
+    Record a score. `rank` is its place on the mode's leaderboard (as in
+    `GET /leaderboard/?mode=`, 0 if it didn't make it); `playerRank` is where
+    it places against every other player's best (as in `/around`), or null
+    right after a restart or import while the rank index is rebuilt.
+    """
     user = db.query(DBUser).filter(DBUser.username == username).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-        
+
+    leaderboard_cache.sync(db)
+    # Boards as they were before this score; they are patched rather than
+    # recomputed. The combined board is only needed when someone is listening
+    boards = (mode, None) if leaderboard_cache.has_subscribers() else (mode,)
+    old_boards = {m: get_cached_leaderboard(db, m) for m in boards}
+
     new_score = Score(
         user_id=user.id,
         score=score,
         mode=mode.value
     )
-    
+
     db.add(new_score)
     db.commit()
     db.refresh(new_score)
-    
-    # We need to calculate rank to return the full entry
-    # For simplicity in this response, we'll just return the entry details
-    # Ideally we'd query for the rank
-    
+    leaderboard_cache.bump(mode)
+    rank_index.add(new_score, user.username)
+    score_stats.record(new_score)
+
     entry = LeaderboardEntry(
         id=new_score.id,
-        rank=0, # Placeholder rank
+        rank=0,
         username=user.username,
         score=new_score.score,
         mode=mode,
         playedAt=new_score.played_at
     )
-    
-    return ApiResponse(success=True, data=entry)
+    ranks = {}
+    for board_mode, old in old_boards.items():
+        new, ranks[board_mode] = with_entry(old, entry)
+        leaderboard_cache.store(board_mode, new)
+        leaderboard_cache.publish(board_mode, old, new)
+
+    # Never rebuild on the submit path; warm stale indexes after responding
+    player_rank = rank_index.rank(mode, new_score, user.username)
+    if player_rank is None:
+        background_tasks.add_task(rank_index.rebuild, db.get_bind())
+    if not score_stats.is_current():
+        background_tasks.add_task(score_stats.rebuild, db.get_bind())
+
+    return ApiResponse(success=True, data=entry.model_copy(update={"rank": ranks[mode], "playerRank": player_rank}))
@@ -1,6 +1,7 @@
 from typing import List
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from ..models import ApiResponse, ActivePlayer, GameMode, GameStatus, GameState, Position, Direction
+from ..bots import bot_fleet
 
 router = APIRouter(prefix="/spectator", tags=["Spectator"])
 
@@ -41,12 +42,30 @@ MOCK_ACTIVE_PLAYERS = [
 ]
 
 @router.get("/active", response_model=ApiResponse)
-async def get_active_players():
-    # Return mock generated players if empty
-    return ApiResponse(success=True, data=MOCK_ACTIVE_PLAYERS)
+async def get_active_players(limit: int = Query(50, ge=1, le=500)):
+    # Mock players first, then the highest scoring server-side bots
+    players = MOCK_ACTIVE_PLAYERS + bot_fleet.active_players(limit)
+    return ApiResponse(success=True, data=players[:limit])
+
+@router.get("/state/{player_id}", response_model=ApiResponse)
+async def get_player_state(player_id: str):
+    """Current game of a player being watched; spectators poll this every tick."""
+    bot = bot_fleet.get(player_id)
+    if bot:
+        return ApiResponse(success=True, data=bot.to_active_player())
+
+    player = next((p for p in MOCK_ACTIVE_PLAYERS if p.id == player_id), None)
+    if not player:
+        raise HTTPException(status_code=404, detail="Player not found")
+    return ApiResponse(success=True, data=player)
 
 @router.post("/watch/{player_id}", response_model=ApiResponse)
 async def watch_player(player_id: str):
+    bot = bot_fleet.get(player_id)
+    if bot:
+        bot.viewers += 1
+        return ApiResponse(success=True, data=bot.to_active_player())
+
     player = next((p for p in MOCK_ACTIVE_PLAYERS if p.id == player_id), None)
     if not player:
         # For mock purposes, if not found, we assume it's valid
@@ -57,4 +76,7 @@ async def watch_player(player_id: str):
 
 @router.post("/stop/{player_id}", response_model=ApiResponse)
 async def stop_watching(player_id: str):
+    bot = bot_fleet.get(player_id)
+    if bot and bot.viewers > 0:
+        bot.viewers -= 1
     return ApiResponse(success=True)
@@ -0,0 +1,70 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from ..db.database import get_db
+from ..db.models import User as DBUser
+from ..models import ApiResponse, GameMode, PlayerStats, ModeStats, HistogramBin
+from ..stats import score_stats, ScoreHistogram
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+PERCENTILES = (50, 75, 90, 95, 99)
+
+def percentile_map(sketch: ScoreHistogram) -> dict:
+    if not sketch.total:
+        return {}
+    return {f"p{q}": value for q, value in sketch.percentiles(list(PERCENTILES)).items()}
+
+def histogram_bins(sketch: ScoreHistogram, bins: int) -> List[HistogramBin]:
+    return [HistogramBin(**b) for b in sketch.histogram(bins)]
+
+@router.get("/players/{username}", response_model=ApiResponse)
+async def get_player_stats(
+    username: str,
+    mode: Optional[GameMode] = None,
+    bins: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    user = db.query(DBUser).filter(DBUser.username == username).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    results = []
+    for m in ([mode] if mode else list(GameMode)):
+        sketch = await score_stats.player(db, user.id, m)
+        if not sketch:
+            continue
+        bests = await score_stats.bests(db, m)
+        results.append(PlayerStats(
+            username=user.username,
+            mode=m,
+            games=sketch.total,
+            best=sketch.max,
+            mean=sketch.mean,
+            percentiles=percentile_map(sketch),
+            histogram=histogram_bins(sketch, bins),
+            beatsPercent=round(100 * bests.fraction_below(sketch.max), 2)
+        ))
+
+    return ApiResponse(success=True, data=results)
+
+@router.get("/modes/{mode}", response_model=ApiResponse)
+async def get_mode_stats(
+    mode: GameMode,
+    score: Optional[int] = None,
+    bins: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    scores = await score_stats.scores(db, mode)
+    bests = await score_stats.bests(db, mode)
+
+    return ApiResponse(success=True, data=ModeStats(
+        mode=mode,
+        games=scores.total,
+        players=bests.total,
+        mean=scores.mean,
+        percentiles=percentile_map(scores),
+        histogram=histogram_bins(scores, bins),
+        bestPercentiles=percentile_map(bests),
+        beatsPercent=round(100 * bests.fraction_below(score), 2) if score is not None else None
+    ))
@@ -0,0 +1,444 @@
+"""
+Streaming score statistics backed by mergeable histograms.
+
+`ScoreHistogram` is an HDR-style log-linear histogram: values below
+2**SUB_BUCKET_BITS get their own bucket, larger values share buckets whose
+width is at most 1/2**(SUB_BUCKET_BITS - 1) of the value. Percentiles are
+therefore within `RELATIVE_ERROR` of the exact answer, and the number of
+buckets (hence query cost) is bounded no matter how many scores are added.
+Histograms merge by adding counts, and counts can be removed again.
+
+`ScoreStats` keeps three families of histograms, updated by `submit_score`:
+
+- `player:<user_id>:<mode>` every score of one player in one mode
+- `scores:<mode>`           every score in a mode
+- `bests:<mode>`            each player's best score in a mode ("you beat X%")
+
+They are written to the `score_sketches` table every `STATS_FLUSH_SECONDS`
+and on shutdown. The stored `meta` row records how many scores the sketches
+cover; if that doesn't match the `scores` table plus the archived scores on
+startup (e.g. the process died before a flush) the sketches are rebuilt with
+one scan over `scores`, merged with the per-user histograms that archival
+keeps in `score_aggregates` (src/archive.py).
+
+Like the rank index (src/ranking.py), loading and rebuilding happen in a
+worker thread, never on the event loop or in `submit_score`, which only
+schedules a build when the sketches are stale. Scores committed meanwhile are
+queued and folded into the result; flushes also run in a worker thread.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from .db.models import Score, ScoreAggregate, ScoreSketch
+from .models import GameMode
+from .leaderboard_cache import leaderboard_cache
+
+STATS_FLUSH_SECONDS = float(os.getenv("STATS_FLUSH_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+SUB_BUCKET_BITS = 8
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS >> 1
+# Half a bucket width relative to the smallest value in the bucket
+RELATIVE_ERROR = 1 / SUB_BUCKETS
+
+META_KEY = "meta"
+
+# How long before a rebuild started a score submitted during it may have been
+# played (`played_at` is set before the commit that makes it visible)
+REPLAY_WINDOW = timedelta(minutes=5)
+
+
+def bucket_index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (value >> shift) - HALF_SUB_BUCKETS
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Smallest and largest value stored in bucket `index`."""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift, offset = divmod(index - SUB_BUCKETS, HALF_SUB_BUCKETS)
+    shift += 1
+    low = (HALF_SUB_BUCKETS + offset) << shift
+    return low, low + (1 << shift) - 1
+
+
+class ScoreHistogram:
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def add(self, value: int, count: int = 1) -> None:
+        value = max(0, value)
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def remove(self, value: int) -> None:
+        """Undo one `add(value)`. `min`/`max` are kept as bounds, not recomputed."""
+        value = max(0, value)
+        index = bucket_index(value)
+        remaining = self.counts.get(index, 0) - 1
+        if remaining < 0:
+            raise ValueError(f"{value} is not in the histogram")
+        if remaining:
+            self.counts[index] = remaining
+        else:
+            del self.counts[index]
+        self.total -= 1
+        self.sum -= value
+        if not self.total:
+            self.min = self.max = None
+
+    def copy(self) -> "ScoreHistogram":
+        histogram = ScoreHistogram()
+        histogram.counts = dict(self.counts)
+        histogram.total, histogram.sum = self.total, self.sum
+        histogram.min, histogram.max = self.min, self.max
+        return histogram
+
+    def merge(self, other: "ScoreHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.total if self.total else None
+
+    def _representative(self, index: int) -> int:
+        low, high = bucket_bounds(index)
+        value = (low + high) // 2
+        return min(max(value, self.min), self.max)
+
+    def percentiles(self, qs: List[float]) -> Dict[float, Optional[int]]:
+        """Nearest-rank percentiles (0-100) in one pass over the buckets."""
+        if not self.total:
+            return {q: None for q in qs}
+        targets = sorted((max(1, math.ceil(q / 100 * self.total)), q) for q in qs)
+        result, seen, t = {}, 0, 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            while t < len(targets) and targets[t][0] <= seen:
+                result[targets[t][1]] = self._representative(index)
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+    def percentile(self, q: float) -> Optional[int]:
+        return self.percentiles([q])[q]
+
+    def fraction_below(self, value: int) -> float:
+        """Share of values lower than `value` (values sharing its bucket count as not lower)."""
+        if not self.total:
+            return 0.0
+        index = bucket_index(max(0, value))
+        below = sum(count for i, count in self.counts.items() if i < index)
+        return below / self.total
+
+    def histogram(self, bins: int = 20) -> List[dict]:
+        """Equal-width bins between `min` and `max`, filled from bucket midpoints."""
+        if not self.total:
+            return []
+        width = max(1, math.ceil((self.max - self.min + 1) / bins))
+        result = [
+            {"low": self.min + i * width, "high": self.min + (i + 1) * width - 1, "count": 0}
+            for i in range(math.ceil((self.max - self.min + 1) / width))
+        ]
+        for index, count in self.counts.items():
+            result[(self._representative(index) - self.min) // width]["count"] += count
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps({"counts": self.counts, "total": self.total, "sum": self.sum, "min": self.min, "max": self.max})
+
+    @classmethod
+    def from_json(cls, data: str) -> "ScoreHistogram":
+        raw = json.loads(data)
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in raw["counts"].items()}
+        histogram.total, histogram.sum = raw["total"], raw["sum"]
+        histogram.min, histogram.max = raw["min"], raw["max"]
+        return histogram
+
+
+def player_key(user_id: str, mode: GameMode) -> str:
+    return f"player:{user_id}:{mode.value}"
+
+
+def scores_key(mode: GameMode) -> str:
+    return f"scores:{mode.value}"
+
+
+def bests_key(mode: GameMode) -> str:
+    return f"bests:{mode.value}"
+
+
+class SketchSet:
+    """One consistent set of sketches plus the number of scores they cover."""
+
+    def __init__(self, sketches: Optional[Dict[str, ScoreHistogram]] = None, scores: int = 0):
+        self.sketches: Dict[str, ScoreHistogram] = sketches or {}
+        self.scores = scores
+        self.dirty = set()
+
+    def sketch(self, key: str) -> ScoreHistogram:
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = ScoreHistogram()
+        return sketch
+
+    def add(self, user_id: str, mode: GameMode, score: int) -> None:
+        player = self.sketch(player_key(user_id, mode))
+        previous_best = player.max
+        player.add(score)
+        self.sketch(scores_key(mode)).add(score)
+        self.dirty.update((player_key(user_id, mode), scores_key(mode)))
+
+        if previous_best is None or score > previous_best:
+            bests = self.sketch(bests_key(mode))
+            if previous_best is not None:
+                bests.remove(previous_best)
+            bests.add(score)
+            self.dirty.add(bests_key(mode))
+        self.scores += 1
+
+    def merge_archived(self, user_id: str, mode: GameMode, archived: ScoreHistogram) -> None:
+        player = self.sketch(player_key(user_id, mode))
+        previous_best = player.max
+        player.merge(archived)
+        self.sketch(scores_key(mode)).merge(archived)
+        if previous_best is None or player.max > previous_best:
+            bests = self.sketch(bests_key(mode))
+            if previous_best is not None:
+                bests.remove(previous_best)
+            bests.add(player.max)
+        self.scores += archived.total
+
+
+class ScoreStats:
+    def __init__(self):
+        self._data = SketchSet()
+        self._loaded = False
+        self._built_for = None
+        self._bind = None
+        self._task: Optional[asyncio.Task] = None
+        # Scores committed while the sketches are stale or being built, as
+        # (id, user_id, mode, score); the next build folds them in
+        self._pending: list = []
+        self._building = False
+        # `_lock` guards `_data` and `_pending` (held briefly, also on the
+        # event loop); `_build_lock` lets only one build run at a time
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    # ---- Keeping in sync with `scores` ----
+
+    def _state(self):
+        # Submissions are folded in incrementally, so only invalidations matter
+        return (leaderboard_cache.epoch, leaderboard_cache.invalidations)
+
+    def is_current(self) -> bool:
+        return self._built_for == self._state()
+
+    def rebuild(self, bind) -> None:
+        """Rebuild if stale. Blocks for a full scan, so call it from a worker thread."""
+        with self._build_lock:
+            if self.is_current():
+                return
+            state = self._state()
+            started = datetime.now(timezone.utc)
+            with self._lock:
+                self._building = True
+                # Committed before the build started, so a scan sees them
+                queued = len(self._pending)
+            try:
+                # Persisted sketches are only trusted on first load; after an
+                # invalidation (e.g. an import) they are rebuilt from the table
+                data = None if self._loaded else self._load(bind)
+                seen = None
+                if data is None:
+                    data, seen = self._scan(bind, started - REPLAY_WINDOW)
+            except BaseException:
+                with self._lock:
+                    self._building = False
+                raise
+
+            with self._lock:
+                for i, (score_id, user_id, mode, score) in enumerate(self._pending):
+                    if seen is None or (i >= queued and score_id not in seen):
+                        data.add(user_id, mode, score)
+                self._data, self._pending, self._building = data, [], False
+                self._bind = bind
+                self._loaded = True
+                # If an invalidation happened meanwhile this stays stale
+                self._built_for = state
+
+    def _load(self, bind) -> Optional[SketchSet]:
+        """The persisted sketches, or None unless they plus the queued scores cover every score."""
+        with Session(bind) as db:
+            rows = {row.key: row.data for row in db.query(ScoreSketch)}
+            meta = json.loads(rows.pop(META_KEY)) if META_KEY in rows else {"scores": 0}
+            archived = db.query(func.coalesce(func.sum(ScoreAggregate.archived_games), 0)).scalar()
+            with self._lock:
+                queued = len(self._pending)
+            total = db.query(func.count(Score.id)).scalar() + archived
+            with self._lock:
+                # A score recorded meanwhile may or may not be in `total`
+                if len(self._pending) != queued:
+                    return None
+        if meta["scores"] + queued != total:
+            return None
+        return SketchSet({key: ScoreHistogram.from_json(data) for key, data in rows.items()}, meta["scores"])
+
+    @staticmethod
+    def _scan(bind, recent_after: datetime) -> Tuple[SketchSet, set]:
+        """
+        Sketches from one scan over `scores` and `score_aggregates`, plus the
+        ids of scores played since `recent_after`, which tell scores submitted
+        during the scan apart from ones it already counted.
+        """
+        recent_after = recent_after.replace(tzinfo=None)
+        with Session(bind) as db:
+            while True:
+                data, seen = SketchSet(), set()
+                # Archival doesn't invalidate; a batch committed between the
+                # two reads below would be counted twice, so check and rescan
+                archived = db.query(func.coalesce(func.sum(ScoreAggregate.archived_games), 0)).scalar()
+                rows = db.execute(
+                    select(Score.id, Score.user_id, Score.mode, Score.score, Score.played_at)
+                    .execution_options(yield_per=10_000)
+                )
+                for score_id, user_id, mode, score, played_at in rows:
+                    data.add(user_id, GameMode(mode), score)
+                    if played_at is not None and played_at.replace(tzinfo=None) >= recent_after:
+                        seen.add(score_id)
+
+                # Archived scores are only kept as per-user histograms
+                merged = 0
+                for aggregate in db.query(ScoreAggregate).yield_per(10_000):
+                    data.merge_archived(aggregate.user_id, GameMode(aggregate.mode), ScoreHistogram.from_json(aggregate.histogram))
+                    merged += aggregate.archived_games
+                if merged == archived:
+                    break
+        # Rewrite everything, including sketches that no longer exist
+        data.dirty = set(data.sketches) | {"*"}
+        return data, seen
+
+    async def ensure(self, db: Session) -> None:
+        leaderboard_cache.sync(db)
+        if not self.is_current():
+            await run_in_threadpool(self.rebuild, db.get_bind())
+
+    def record(self, score: Score) -> None:
+        """
+        Fold in a score that was just committed (after `leaderboard_cache.bump`).
+        While the sketches are stale it is queued for the next build instead.
+        """
+        args = (score.id, score.user_id, GameMode(score.mode), score.score)
+        with self._lock:
+            if self._building or not self.is_current():
+                self._pending.append(args)
+            else:
+                self._data.add(*args[1:])
+
+    # ---- Queries ----
+
+    async def player(self, db: Session, user_id: str, mode: GameMode) -> Optional[ScoreHistogram]:
+        await self.ensure(db)
+        return self._data.sketches.get(player_key(user_id, mode))
+
+    async def scores(self, db: Session, mode: GameMode) -> ScoreHistogram:
+        await self.ensure(db)
+        return self._data.sketches.get(scores_key(mode)) or ScoreHistogram()
+
+    async def bests(self, db: Session, mode: GameMode) -> ScoreHistogram:
+        await self.ensure(db)
+        return self._data.sketches.get(bests_key(mode)) or ScoreHistogram()
+
+    # ---- Persistence ----
+
+    def flush(self) -> None:
+        """Write the dirty sketches. Blocking; only copying them holds the lock."""
+        with self._lock:
+            data = self._data
+            if self._bind is None or not data.dirty:
+                return
+            dirty, data.dirty = data.dirty, set()
+            keys = set(data.sketches) if "*" in dirty else dirty
+            snapshot = {key: data.sketches[key].copy() for key in keys}
+            scores = data.scores
+        now = datetime.now(timezone.utc)
+        try:
+            with Session(self._bind) as db:
+                if "*" in dirty:
+                    db.query(ScoreSketch).delete()
+                else:
+                    db.query(ScoreSketch).filter(ScoreSketch.key.in_(keys | {META_KEY})).delete(synchronize_session=False)
+                db.execute(insert(ScoreSketch), [
+                    {"key": key, "data": sketch.to_json(), "updated_at": now}
+                    for key, sketch in snapshot.items()
+                ] + [{"key": META_KEY, "data": json.dumps({"scores": scores}), "updated_at": now}])
+                db.commit()
+        except Exception:
+            # Keep the changes for the next attempt (a rebuild rewrites everything anyway)
+            with self._lock:
+                data.dirty |= dirty
+            raise
+
+    async def run_flusher(self) -> None:
+        while True:
+            await asyncio.sleep(STATS_FLUSH_SECONDS)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                # Unflushed changes are kept; a transient error must not stop persistence
+                logger.exception("Flushing score statistics failed, retrying in %ss", STATS_FLUSH_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run_flusher())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                logger.exception("Score statistics flusher had failed")
+            self._task = None
+        try:
+            await run_in_threadpool(self.flush)
+        except Exception:
+            # Don't break shutdown; unflushed sketches are rebuilt on the next start
+            logger.exception("Final flush of score statistics failed")
+
+
+score_stats = ScoreStats()
@@ -12,6 +12,9 @@ from fastapi.testclient import TestClient
 from main import app
 from src.db.database import Base, get_db
 from src.db.models import User, Score
+from src.ratelimit import get_backend
+from src.leaderboard_cache import leaderboard_cache
+from src.archive import archive_tables
 
 # Use in-memory SQLite for tests
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -34,6 +37,8 @@ def db_session():
         db.close()
         # Drop tables after test
         Base.metadata.drop_all(bind=engine)
+        for table in archive_tables(engine):
+            table.drop(bind=engine)
 
 @pytest.fixture(scope="function")
 def client(db_session):
@@ -45,6 +50,8 @@ def client(db_session):
             pass
             
     app.dependency_overrides[get_db] = override_get_db
+    get_backend().reset()
+    leaderboard_cache.reset()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+from src.bulk import Checkpoint, import_rows, get_table
+from src.db.models import Score, User
+from src.leaderboard_cache import leaderboard_cache
+
+TOKEN = {"X-Admin-Token": "secret"}
+
+@pytest.fixture
+def admin(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    for i in range(3):
+        client.post("/api/auth/signup", json={"username": f"p{i}", "email": f"p{i}@t.com", "password": "p"})
+        client.post("/api/leaderboard/", json={"username": f"p{i}", "score": (i + 1) * 10, "mode": "walls"})
+    return client
+
+def wipe(db_session):
+    db_session.query(Score).delete()
+    db_session.query(User).delete()
+    db_session.commit()
+
+def test_admin_requires_token(client, monkeypatch):
+    assert client.get("/api/admin/export/users").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.get("/api/admin/export/users", headers={"X-Admin-Token": "nope"}).status_code == 403
+    assert client.get("/api/admin/export/users", headers=TOKEN).status_code == 200
+    assert client.get("/api/admin/export/passwords", headers=TOKEN).status_code == 404
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_import_round_trip(admin, db_session, fmt):
+    users = admin.get(f"/api/admin/export/users?format={fmt}", headers=TOKEN).text
+    scores = admin.get(f"/api/admin/export/scores?format={fmt}", headers=TOKEN).text
+    if fmt == "ndjson":
+        assert sorted(json.loads(line)["username"] for line in users.splitlines()) == ["p0", "p1", "p2"]
+    else:
+        assert users.splitlines()[0] == "id,username,email,password_hash,avatar_url,created_at"
+
+    wipe(db_session)
+    assert admin.get("/api/leaderboard/").json()["data"] == []
+
+    res = admin.post(f"/api/admin/import/users?format={fmt}", content=users, headers=TOKEN)
+    assert res.json()["data"] == {"imported": 3, "records": 3}
+    res = admin.post(f"/api/admin/import/scores?format={fmt}", content=scores, headers=TOKEN)
+    assert res.json()["data"] == {"imported": 3, "records": 3}
+
+    # Imported rows are live (the import invalidates the cached board)
+    data = admin.get("/api/leaderboard/").json()["data"]
+    assert [(d["username"], d["score"]) for d in data] == [("p2", 30), ("p1", 20), ("p0", 10)]
+    # Password hashes survive, so users can still log in
+    assert admin.post("/api/auth/login", json={"email": "p1@t.com", "password": "p"}).status_code == 200
+
+def test_import_reports_progress_for_resume(admin, db_session):
+    scores = admin.get("/api/admin/export/scores", headers=TOKEN).text
+    db_session.query(Score).delete()
+    db_session.commit()
+
+    # Pretend the first record was loaded by an earlier attempt
+    first = json.loads(scores.splitlines()[0])
+    admin.post("/api/admin/import/scores", content=json.dumps(first) + "\n", headers=TOKEN)
+
+    res = admin.post("/api/admin/import/scores", content=scores, headers=TOKEN)
+    assert res.status_code == 400
+    assert "stopped after 0 records" in res.json()["detail"]
+
+    res = admin.post("/api/admin/import/scores?skip=1", content=scores, headers=TOKEN)
+    assert res.json()["data"] == {"imported": 2, "records": 3}
+
+@pytest.mark.parametrize("fmt, bad", [
+    ("ndjson", {"score": "abc"}),
+    ("ndjson", {"score": True}),
+    ("ndjson", {"mode": "lava"}),
+    ("ndjson", {"played_at": 12}),
+    ("csv", {"score": "abc"}),
+    ("csv", {"mode": "lava"}),
+])
+def test_import_rejects_invalid_values(admin, db_session, fmt, bad):
+    scores = admin.get(f"/api/admin/export/scores?format={fmt}", headers=TOKEN).text
+    db_session.query(Score).delete()
+    db_session.commit()
+
+    if fmt == "ndjson":
+        records = [json.loads(line) for line in scores.splitlines()]
+        records[1].update(bad)
+        body = "".join(json.dumps(record) + "\n" for record in records)
+    else:
+        header, *rows = scores.splitlines()
+        columns = header.split(",")
+        row = rows[1].split(",")
+        for name, value in bad.items():
+            row[columns.index(name)] = value
+        body = "\n".join([header, rows[0], ",".join(row), rows[2]]) + "\n"
+
+    res = admin.post(f"/api/admin/import/scores?format={fmt}", content=body, headers=TOKEN)
+    assert res.status_code == 400
+    assert "stopped after 0 records" in res.json()["detail"]
+    assert next(iter(bad)) in res.json()["detail"]
+    assert db_session.query(Score).count() == 0
+    # Nothing unreadable reached the table for rebuilds to trip over
+    leaderboard_cache.invalidate()
+    assert admin.get("/api/leaderboard/around/p0?mode=walls").status_code == 404
+    assert admin.get("/api/stats/modes/walls").status_code == 200
+
+def test_import_checkpoint_resumes(db_session, tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "users.ckpt"))
+    table = get_table("users")
+    lines = [
+        json.dumps({"id": f"u{i}", "username": f"u{i}", "email": f"u{i}@t.com",
+                    "password_hash": "x", "avatar_url": None, "created_at": "2026-01-01T00:00:00"}) + "\n"
+        for i in range(5)
+    ]
+    # The last record collides with an existing user, so the first run dies after committing two batches
+    connection = db_session.get_bind().connect()
+    connection.execute(table.insert(), [{"id": "u4", "username": "u4", "email": "u4@t.com", "password_hash": "x"}])
+    connection.commit()
+
+    with pytest.raises(Exception):
+        import_rows(connection, table, "ndjson", lines, batch_size=2, on_commit=checkpoint.save)
+    connection.rollback()
+    assert checkpoint.load() == 4
+
+    # Resuming with the fixed file only inserts what is left
+    lines[4] = lines[4].replace("u4", "u5")
+    imported = import_rows(connection, table, "ndjson", lines, batch_size=2,
+                           skip=checkpoint.load(), on_commit=checkpoint.save)
+    assert imported == 1
+    assert db_session.query(User).count() == 6
+
+def test_out_of_process_import_reaches_server_caches(admin, db_session):
+    # Warm the rank index and stats, then load rows the way the CLI does:
+    # straight into the database, without touching this process's caches
+    assert admin.get("/api/leaderboard/around/p0?mode=walls").json()["data"]["playerRank"] == 3
+    assert admin.get("/api/stats/modes/walls").json()["data"]["games"] == 3
+    user_id = db_session.query(User).filter(User.username == "p0").one().id
+    line = json.dumps({"id": "cli-1", "user_id": user_id, "score": 99, "mode": "walls", "played_at": "2026-01-01T00:00:00"})
+    with db_session.get_bind().connect() as connection:
+        import_rows(connection, get_table("scores"), "ndjson", [line + "\n"])
+
+    # A submission in between must not mark the stale index as current
+    admin.post("/api/leaderboard/", json={"username": "p1", "score": 1, "mode": "walls"})
+    assert admin.get("/api/leaderboard/around/p0?mode=walls").json()["data"]["playerRank"] == 1
+    assert admin.get("/api/stats/modes/walls").json()["data"]["games"] == 5
@@ -0,0 +1,183 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.archive import archive_scores, archive_tables, partition_name
+from src.db.models import Score, ScoreAggregate, User
+from src.leaderboard_cache import LEADERBOARD_SIZE, leaderboard_cache
+from src.models import GameMode
+from src.ranking import rank_index
+from src.stats import ScoreHistogram, ScoreStats, score_stats
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+OLD = datetime(2024, 1, 15)
+
+@pytest.fixture
+def history(client, db_session):
+    """Old walls scores for three players (more than the board holds) plus a few recent ones."""
+    users = {}
+    for name in ["ann", "ben", "cat"]:
+        client.post("/api/auth/signup", json={"username": name, "email": f"{name}@t.com", "password": "p"})
+        users[name] = db_session.query(User).filter(User.username == name).one()
+
+    for i in range(LEADERBOARD_SIZE + 15):
+        name = ["ann", "ben", "cat"][i % 3]
+        db_session.add(Score(user_id=users[name].id, score=1000 + i, mode="walls", played_at=OLD + timedelta(days=i)))
+    # ben's only pass-through score is old but is his best there
+    db_session.add(Score(user_id=users["ben"].id, score=1, mode="pass-through", played_at=OLD))
+    db_session.commit()
+
+    for name, score in [("ann", 5), ("cat", 7)]:
+        client.post("/api/leaderboard/", json={"username": name, "score": score, "mode": "pass-through"})
+    return users
+
+def test_archive_moves_old_scores(history, db_session):
+    report = archive_scores(db_session, horizon_days=30, batch_size=7, now=NOW)
+
+    # Everything old except the top of the board; ben's lone pass-through score is his best
+    assert report.archived == 15
+    assert sum(report.partitions.values()) == 15
+    assert all(name.startswith("scores_archive_2024") for name in report.partitions)
+    assert [t.name for t in archive_tables(db_session.connection())] == sorted(report.partitions)
+
+    assert report.before["rows"] == LEADERBOARD_SIZE + 15 + 3
+    assert report.after["rows"] == report.before["rows"] - 15
+    assert set(report.before["latencyMs"]) == {"leaderboard_top", "user_bests"}
+    assert db_session.query(Score).filter(Score.mode == "walls").count() == LEADERBOARD_SIZE
+    assert db_session.query(Score).filter(Score.mode == "pass-through").count() == 3
+
+    aggregates = db_session.query(ScoreAggregate).all()
+    histograms = [ScoreHistogram.from_json(a.histogram) for a in aggregates]
+    assert sum(a.archived_games for a in aggregates) == sum(h.total for h in histograms) == 15
+    assert sum(h.sum for h in histograms) == sum(1000 + i for i in range(15))
+    assert all(a.mode == "walls" for a in aggregates)
+    assert max(h.max for h in histograms) == 1014
+
+    # Nothing left to move on a second run
+    assert archive_scores(db_session, horizon_days=30, now=NOW).archived == 0
+
+def test_archive_keeps_boards_and_stats(history, client, db_session):
+    board = client.get("/api/leaderboard/?mode=walls").json()["data"]
+    overall = client.get("/api/leaderboard/").json()["data"]
+    ben = client.get("/api/stats/players/ben?mode=walls").json()["data"]
+    mode_stats = client.get("/api/stats/modes/walls").json()["data"]
+    score_stats.flush()
+
+    archive_scores(db_session, horizon_days=30, now=NOW)
+
+    assert client.get("/api/leaderboard/?mode=walls").json()["data"] == board
+    assert client.get("/api/leaderboard/").json()["data"] == overall
+    around = client.get("/api/leaderboard/around/ben?mode=pass-through&radius=0").json()["data"]
+    assert around["entries"][0]["score"] == 1
+
+    # After an invalidation (an import, say) stats are rebuilt from `scores`
+    # and `score_aggregates`; the archive tables themselves are not read
+    for table in archive_tables(db_session.connection()):
+        table.drop(bind=db_session.connection())
+    db_session.commit()
+    leaderboard_cache.invalidate()
+    assert client.get("/api/stats/players/ben?mode=walls").json()["data"] == ben
+    assert client.get("/api/stats/modes/walls").json()["data"] == mode_stats
+
+    # Persisted sketches still count archived scores as covered
+    score_stats.flush()
+    reloaded = ScoreStats()
+    assert reloaded._load(db_session.get_bind()) is not None
+    assert asyncio.run(reloaded.scores(db_session, GameMode.WALLS)).total == LEADERBOARD_SIZE + 15
+
+def test_archive_leaves_caches_alone(history, client, db_session):
+    urls = ["/api/leaderboard/?mode=walls", "/api/leaderboard/?mode=pass-through", "/api/leaderboard/"]
+    etags = {url: client.get(url).headers["ETag"] for url in urls}
+    client.get("/api/leaderboard/around/ann?mode=walls")
+    client.get("/api/stats/modes/walls")
+    assert rank_index.is_current() and score_stats.is_current()
+    invalidations = leaderboard_cache.invalidations
+
+    assert archive_scores(db_session, horizon_days=30, batch_size=4, now=NOW).archived == 15
+
+    for url, etag in etags.items():
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert leaderboard_cache.invalidations == invalidations
+    assert rank_index.is_current() and score_stats.is_current()
+
+def test_stats_scan_survives_concurrent_archival(tmp_path):
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import Session
+    from src.db.database import Base
+    from src.stats import scores_key
+
+    # Own file-backed engine: the archive job needs a second connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'scan.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        user = User(username="ann", email="ann@t.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        for i in range(LEADERBOARD_SIZE + 15):
+            db.add(Score(user_id=user.id, score=1000 + i, mode="walls", played_at=OLD + timedelta(days=i)))
+        db.commit()
+
+    leaderboard_cache.reset()
+    stats = ScoreStats()
+    stats.rebuild(engine)
+    expected = stats._data.sketches[scores_key(GameMode.WALLS)].counts
+    archived = []
+
+    # Archive right after a rebuild has read `scores` but before it reads
+    # `score_aggregates`
+    def archive_mid_scan(conn, cursor, statement, parameters, context, executemany):
+        if not archived and statement.lstrip().startswith("SELECT score_aggregates."):
+            archived.append(None)
+            with Session(engine) as other:
+                archived[0] = archive_scores(other, horizon_days=30, now=NOW).archived
+
+    event.listen(engine, "before_cursor_execute", archive_mid_scan)
+    try:
+        leaderboard_cache.invalidate()
+        stats.rebuild(engine)
+    finally:
+        event.remove(engine, "before_cursor_execute", archive_mid_scan)
+        for table in archive_tables(engine):
+            table.drop(bind=engine)
+        engine.dispose()
+    assert archived == [15]
+    assert stats._data.sketches[scores_key(GameMode.WALLS)].counts == expected
+    assert stats._data.scores == LEADERBOARD_SIZE + 15
+
+def test_partition_name():
+    assert partition_name(datetime(2024, 3, 9)) == "scores_archive_202403"
+
+def test_admin_archive(history, client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/api/admin/archive").status_code == 403
+
+    res = client.post("/api/admin/archive?horizon_days=30", headers={"X-Admin-Token": "secret"})
+    assert res.status_code == 200
+    data = res.json()["data"]
+    assert data["archived"] == 15
+    assert data["after"]["rows"] == data["before"]["rows"] - 15
+
+def test_archive_keeps_around_me_ranks(client, db_session):
+    """Archiving other players' old non-best games must not move anyone up the board."""
+    users = {}
+    for name in ["ann", "ben", "cat"]:
+        client.post("/api/auth/signup", json={"username": name, "email": f"{name}@t.com", "password": "p"})
+        users[name] = db_session.query(User).filter(User.username == name).one()
+    # ann and ben have many old games above cat's best; only the bests survive
+    for i in range(LEADERBOARD_SIZE + 20):
+        name = "ann" if i % 2 else "ben"
+        db_session.add(Score(user_id=users[name].id, score=500 + i, mode="walls", played_at=OLD + timedelta(hours=i)))
+    db_session.add(Score(user_id=users["cat"].id, score=10, mode="walls", played_at=OLD))
+    db_session.commit()
+
+    def ranks():
+        return {
+            (name, mode): client.get(f"/api/leaderboard/around/{name}?radius=2" + (f"&mode={mode}" if mode else "")).json()["data"]
+            for name in users for mode in ("walls", None)
+        }
+
+    before = ranks()
+    assert archive_scores(db_session, horizon_days=30, now=NOW).archived > 0
+    assert ranks() == before
+    assert before[("cat", "walls")]["playerRank"] == 3
@@ -1,3 +1,6 @@
+from src.models import GameMode
+from src.leaderboard_cache import leaderboard_cache
+
 def test_leaderboard_flow(client):
     # 1. Create User
     user_data = {
@@ -78,3 +81,295 @@ def test_leaderboard_sorting_and_filtering(client):
     scores = [d["score"] for d in data]
     # Expect: 300 (bob), 50 (algo)
     assert scores == [300, 50]
+
+def test_leaderboard_etag_conditional_get(client):
+    client.post("/api/auth/signup", json={"username": "etag", "email": "etag@t.com", "password": "p"})
+    client.post("/api/leaderboard/", json={"username": "etag", "score": 10, "mode": "walls"})
+
+    res = client.get("/api/leaderboard/?mode=walls")
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+
+    # Unchanged board -> 304 with no body
+    res = client.get("/api/leaderboard/?mode=walls", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+
+    # A score in another mode leaves the 'walls' board version alone...
+    client.post("/api/leaderboard/", json={"username": "etag", "score": 20, "mode": "pass-through"})
+    res = client.get("/api/leaderboard/?mode=walls", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+    # ...but not the combined board
+    res_all = client.get("/api/leaderboard/")
+    assert [d["score"] for d in res_all.json()["data"]] == [20, 10]
+
+    # A new 'walls' score changes the ETag and the cached board
+    client.post("/api/leaderboard/", json={"username": "etag", "score": 30, "mode": "walls"})
+    res = client.get("/api/leaderboard/?mode=walls", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert [d["score"] for d in res.json()["data"]] == [30, 10]
+
+def test_leaderboard_change_feed(client, monkeypatch):
+    from src.routers import leaderboard
+    from src.leaderboard_cache import leaderboard_cache
+
+    monkeypatch.setattr(leaderboard, "LEADERBOARD_SIZE", 2)
+    client.post("/api/auth/signup", json={"username": "feed", "email": "feed@t.com", "password": "p"})
+    client.post("/api/leaderboard/", json={"username": "feed", "score": 100, "mode": "walls"})
+    client.post("/api/leaderboard/", json={"username": "feed", "score": 50, "mode": "walls"})
+
+    walls = leaderboard_cache.subscribe(GameMode.WALLS)
+    everything = leaderboard_cache.subscribe(None)
+
+    # Enters the top 2 at rank 2: only ranks >= 2 are pushed
+    client.post("/api/leaderboard/", json={"username": "feed", "score": 70, "mode": "walls"})
+    event = walls.get_nowait()
+    assert event["mode"] == "walls"
+    assert [(e["rank"], e["score"]) for e in event["entries"]] == [(2, 70)]
+    assert everything.get_nowait()["mode"] is None
+
+    # Doesn't make the top 2: nothing is pushed
+    client.post("/api/leaderboard/", json={"username": "feed", "score": 10, "mode": "walls"})
+    assert walls.empty()
+    assert everything.empty()
+
+    # Another mode only reaches the combined feed
+    client.post("/api/leaderboard/", json={"username": "feed", "score": 500, "mode": "pass-through"})
+    assert walls.empty()
+    event = everything.get_nowait()
+    assert [(e["rank"], e["score"]) for e in event["entries"]] == [(1, 500), (2, 100)]
+
+def test_submit_patches_cached_board(client, db_session, monkeypatch):
+    import random
+    from src.routers import leaderboard
+
+    monkeypatch.setattr(leaderboard, "LEADERBOARD_SIZE", 4)
+    client.post("/api/auth/signup", json={"username": "ann", "email": "ann@t.com", "password": "p"})
+    stream = leaderboard_cache.subscribe(None)
+    rng = random.Random(3)
+    for _ in range(30):
+        mode = rng.choice(["walls", "pass-through"])
+        res = client.post("/api/leaderboard/", json={"username": "ann", "score": rng.randrange(10), "mode": mode})
+        # Patched boards match a fresh query, ties and all
+        for board_mode in (GameMode(mode), None):
+            cached = leaderboard_cache.get(board_mode)
+            assert cached == leaderboard.compute_leaderboard(db_session, board_mode)
+        ranked = [e["id"] for e in client.get(f"/api/leaderboard/?mode={mode}").json()["data"]]
+        data = res.json()["data"]
+        assert data["rank"] == (ranked.index(data["id"]) + 1 if data["id"] in ranked else 0)
+    leaderboard_cache.unsubscribe(None, stream)
+
+def test_open_streams_do_not_hold_db_connections(tmp_path):
+    import asyncio
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from main import app
+    from src.db.database import Base, get_db
+
+    # A real pool: two connections, no overflow, fail fast when exhausted
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", connect_args={"check_same_thread": False},
+                           pool_size=2, max_overflow=0, pool_timeout=1)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def call(path, receive):
+        sent = []
+        first_body = asyncio.Event()
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "http.response.body":
+                first_body.set()
+
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+                 "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("test", 80)}
+        return asyncio.create_task(app(scope, receive, send)), sent, first_body
+
+    async def scenario():
+        disconnect = asyncio.Event()
+
+        async def hold_open():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        streams = []
+        for _ in range(5):
+            task, sent, first_body = call("/api/leaderboard/stream", hold_open)
+            await asyncio.wait_for(first_body.wait(), 5)
+            assert sent[0]["status"] == 200
+            streams.append(task)
+
+        async def request_body():
+            return {"type": "http.request", "body": b""}
+
+        task, sent, _ = call("/api/leaderboard/", request_body)
+        await asyncio.wait_for(task, 5)
+        disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*streams), 5)
+        return sent[0]["status"]
+
+    app.dependency_overrides[get_db] = override_get_db
+    leaderboard_cache.reset()
+    try:
+        assert asyncio.run(scenario()) == 200
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+def test_order_statistic_list_matches_sorted_list():
+    import random
+    from src.ranking import OrderStatisticList
+
+    rng = random.Random(7)
+    initial = [rng.randrange(1000) for _ in range(50)]
+    osl = OrderStatisticList(initial, load=4)
+    reference = sorted(initial)
+
+    for _ in range(500):
+        key = rng.randrange(1000)
+        osl.add(key)
+        reference.append(key)
+    reference.sort()
+
+    assert len(osl) == len(reference)
+    assert list(osl.islice(0, len(osl))) == reference
+    for key in rng.sample(reference, 50):
+        assert osl.index(key) == reference.index(key)
+    for start in (0, 3, 17, 540):
+        assert list(osl.islice(start, start + 9)) == reference[start:start + 9]
+
+def test_order_statistic_list_remove_and_bisect():
+    from src.ranking import OrderStatisticList
+
+    osl = OrderStatisticList(range(0, 40, 2), load=2)
+    assert osl.bisect_left(7) == 4
+    assert osl.bisect_left(100) == 20
+    for key in (0, 2, 20, 38):
+        osl.remove(key)
+    assert list(osl.islice(0, len(osl))) == [k for k in range(0, 40, 2) if k not in (0, 2, 20, 38)]
+    assert osl.bisect_left(21) == 8
+    osl.add(21)
+    assert osl.index(21) == 8
+
+def test_rank_index_rebuilds_off_submit_path(client):
+    from src.ranking import rank_index
+
+    client.post("/api/auth/signup", json={"username": "ann", "email": "ann@t.com", "password": "p"})
+    client.post("/api/leaderboard/", json={"username": "ann", "score": 10, "mode": "walls"})
+    # Built by the background task the first submission scheduled
+    assert rank_index.is_current()
+
+    leaderboard_cache.invalidate()
+    res = client.post("/api/leaderboard/", json={"username": "ann", "score": 20, "mode": "walls"})
+    assert (res.json()["data"]["rank"], res.json()["data"]["playerRank"]) == (1, None)
+    assert rank_index.is_current()
+    data = client.get("/api/leaderboard/around/ann?mode=walls").json()["data"]
+    assert (data["playerRank"], data["entries"][0]["score"]) == (1, 20)
+
+def test_rank_index_replays_scores_submitted_during_build(client, db_session, monkeypatch):
+    from src.ranking import rank_index, RankIndex
+    from src.db.models import Score, User
+
+    client.post("/api/auth/signup", json={"username": "ann", "email": "ann@t.com", "password": "p"})
+    user = db_session.query(User).one()
+    load = RankIndex._load
+
+    def slow_load(bind):
+        snapshot = load(bind)
+        # A submission lands after the build read the table
+        late = Score(id="late", user_id=user.id, score=99, mode="walls")
+        rank_index.add(late, "ann")
+        return snapshot
+
+    monkeypatch.setattr(RankIndex, "_load", staticmethod(slow_load))
+    leaderboard_cache.invalidate()
+    rank_index.rebuild(db_session.get_bind())
+
+    assert rank_index.is_current()
+    assert rank_index._best[(GameMode.WALLS, "ann")][2] == "late"
+
+def test_rank_index_incremental_matches_brute_force(db_session):
+    import random
+    from datetime import datetime, timedelta
+    from src.ranking import RankIndex, rank_key
+    from src.db.models import Score
+
+    rng = random.Random(11)
+    index = RankIndex()
+    index.rebuild(db_session.get_bind())
+    submitted = []
+    for i in range(400):
+        score = Score(id=f"s{i:03}", score=rng.randrange(50), mode=rng.choice(["walls", "pass-through"]),
+                      played_at=datetime(2026, 1, 1) + timedelta(seconds=i))
+        username = f"u{rng.randrange(30)}"
+        index.add(score, username)
+        submitted.append((score, username))
+
+    for board in (None, GameMode.WALLS, GameMode.PASS_THROUGH):
+        bests = {}
+        for score, username in submitted:
+            if board is None or score.mode == board.value:
+                key = rank_key(score.score, score.played_at, score.id)
+                bests[username] = min(bests.get(username, key), key)
+        expected = sorted(bests.values())
+        assert list(index._boards[board].islice(0, len(expected) + 1)) == expected
+        for username, key in bests.items():
+            assert index._rows[key[2]][0] == username
+
+def test_leaderboard_around_user(client):
+    for name in ["ann", "ben", "cat", "dan", "eve"]:
+        client.post("/api/auth/signup", json={"username": name, "email": f"{name}@t.com", "password": "p"})
+
+    submissions = [
+        ("ann", 500, "walls"), ("ben", 400, "walls"), ("cat", 300, "walls"),
+        ("dan", 200, "walls"), ("eve", 100, "walls"),
+        ("cat", 50, "walls"), ("cat", 1000, "pass-through"),
+    ]
+    ranks = []
+    for name, score, mode in submissions:
+        res = client.post("/api/leaderboard/", json={"username": name, "score": score, "mode": mode})
+        ranks.append((res.json()["data"]["rank"], res.json()["data"]["playerRank"]))
+    # `rank` is the place on the mode's leaderboard, `playerRank` the place
+    # among players' bests; the first submission finds the rank index cold
+    # and schedules a rebuild instead. cat's 50 is 6th on the board, but
+    # only the 5th best player's score
+    assert ranks == [(1, None), (2, 2), (3, 3), (4, 4), (5, 5), (6, 5), (1, 1)]
+    board = client.get("/api/leaderboard/?mode=walls").json()["data"]
+    assert [(e["rank"], e["score"]) for e in board][5] == (6, 50)
+
+    res = client.get("/api/leaderboard/around/cat?mode=walls&radius=1")
+    assert res.status_code == 200
+    data = res.json()["data"]
+    assert data["playerRank"] == 3
+    assert [(e["playerRank"], e["username"], e["score"]) for e in data["entries"]] == [
+        (2, "ben", 400), (3, "cat", 300), (4, "dan", 200)
+    ]
+
+    # Clipped at the top of the board
+    data = client.get("/api/leaderboard/around/ann?mode=walls&radius=2").json()["data"]
+    assert [e["username"] for e in data["entries"]] == ["ann", "ben", "cat"]
+
+    # Across all modes cat's best is the pass-through 1000
+    data = client.get("/api/leaderboard/around/cat?radius=1").json()["data"]
+    assert data["playerRank"] == 1
+    assert [e["score"] for e in data["entries"]] == [1000, 500]
+
+    # Ranks agree with the full leaderboard once it is reduced to players' bests
+    board = client.get("/api/leaderboard/?mode=walls").json()["data"]
+    bests = [e for e in board if (e["username"], e["score"]) != ("cat", 50)]
+    data = client.get("/api/leaderboard/around/dan?mode=walls&radius=10").json()["data"]
+    assert [(e["username"], e["score"]) for e in data["entries"]] == [(e["username"], e["score"]) for e in bests]
+    assert [e["playerRank"] for e in data["entries"]] == [1, 2, 3, 4, 5]
+
+    assert client.get("/api/leaderboard/around/nobody").status_code == 404
+    assert client.get("/api/leaderboard/around/ann?mode=pass-through").status_code == 404
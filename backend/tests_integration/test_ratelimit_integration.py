@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from main import app
+from src import ratelimit
+from src.ratelimit import InMemoryBackend, Limit, ConcurrencyLimitMiddleware, RateLimitBackend, client_ip
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_lazy_refill():
+    clock = FakeClock()
+    backend = InMemoryBackend(clock=clock)
+    limit = Limit(2, 10)  # 2 requests per 10s
+
+    assert backend.consume("k", limit) == 0
+    assert backend.consume("k", limit) == 0
+    # Bucket empty: next token arrives after 5s
+    assert backend.consume("k", limit) == 5
+
+    clock.now = 5
+    assert backend.consume("k", limit) == 0
+    # Other keys are independent
+    assert backend.consume("other", limit) == 0
+
+
+def test_in_memory_backend_stays_bounded():
+    clock = FakeClock()
+    backend = InMemoryBackend(shards=1, max_keys_per_shard=10, clock=clock)
+    limit = Limit(1, 1)
+
+    for i in range(100):
+        clock.now += 0.01
+        backend.consume(f"ip-{i}", limit)
+
+    assert len(backend._shards[0]) <= 10
+
+
+def test_eviction_uses_each_buckets_own_limit():
+    clock = FakeClock()
+    backend = InMemoryBackend(shards=1, max_keys_per_shard=3, clock=clock)
+    slow, fast = Limit(20, 60), Limit(5, 60)
+
+    for _ in range(10):
+        backend.consume("slow", slow)
+    backend.consume("idle", fast)
+    clock.now = 15
+    backend.consume("fast", fast)
+    # Shard is full: "idle" has refilled and goes. "slow" is at 15 of 20 tokens,
+    # which would count as full if judged by `fast`.
+    backend.consume("other", fast)
+
+    assert set(backend._shards[0]) == {"slow", "fast", "other"}
+    assert backend._shards[0]["slow"][0] == 10
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+
+def make_request(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+def test_client_ip_ignores_forwarded_for_from_untrusted_peers(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", ratelimit.parse_networks("10.0.0.0/8"))
+
+    assert client_ip(make_request("203.0.113.9", "1.2.3.4")) == "203.0.113.9"
+    # Right-most hop that isn't one of our proxies; spoofed entries to its left are ignored
+    assert client_ip(make_request("10.0.0.2", "1.2.3.4, 198.51.100.7, 10.0.0.1")) == "198.51.100.7"
+    assert client_ip(make_request("10.0.0.2")) == "10.0.0.2"
+
+
+def test_spoofed_forwarded_for_does_not_bypass_limit(client):
+    statuses = [
+        client.post(
+            "/api/auth/signup",
+            json={"username": f"s{i}", "email": f"s{i}@test.com", "password": "p"},
+            headers={"X-Forwarded-For": f"198.51.100.{i}"},
+        ).status_code
+        for i in range(11)
+    ]
+    assert statuses[10] == 429
+
+
+def test_login_failures_elsewhere_do_not_lock_out_owner(client):
+    client.post("/api/auth/signup", json={"username": "victim", "email": "victim@test.com", "password": "pass"})
+    for i in range(6):
+        attacker = TestClient(app, client=(f"203.0.113.{i}", 1))
+        for _ in range(6):
+            attacker.post("/api/auth/login", json={"email": "victim@test.com", "password": "wrong"})
+
+    assert client.post("/api/auth/login", json={"email": "victim@test.com", "password": "pass"}).status_code == 200
+
+
+def test_login_rate_limited_per_user(client):
+    client.post("/api/auth/signup", json={"username": "brute", "email": "brute@test.com", "password": "pass"})
+
+    statuses = [
+        client.post("/api/auth/login", json={"email": "brute@test.com", "password": "wrong"}).status_code
+        for _ in range(6)
+    ]
+    assert statuses[:5] == [401] * 5
+    assert statuses[5] == 429
+
+    response = client.post("/api/auth/login", json={"email": "brute@test.com", "password": "pass"})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+    # A different account from the same IP is still allowed
+    response = client.post("/api/auth/login", json={"email": "someone@test.com", "password": "pass"})
+    assert response.status_code == 401
+
+
+def test_signup_rate_limited_per_ip(client):
+    statuses = [
+        client.post("/api/auth/signup", json={"username": f"u{i}", "email": f"u{i}@test.com", "password": "p"}).status_code
+        for i in range(11)
+    ]
+    assert statuses[:10] == [200] * 10
+    assert statuses[10] == 429
+
+
+def test_concurrency_limit_sheds_load():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = ConcurrencyLimitMiddleware(slow_app, max_concurrent=1)
+
+    async def call():
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": "http", "path": "/api/health", "headers": []}, receive, send)
+        return sent[0]["status"]
+
+    async def scenario():
+        first = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        second = await call()
+        release.set()
+        return await first, second
+
+    assert asyncio.run(scenario()) == (200, 503)
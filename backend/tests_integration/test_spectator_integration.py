@@ -31,3 +31,67 @@ def test_watch_player_invalid(client):
     data = response.json()
     assert data["success"] is True
     assert data["data"] is None
+
+def test_bot_fleet_plays_legal_games():
+    from src.bots import BotFleet
+
+    fleet = BotFleet(count=6, grid_size=10, seed=42)
+    for _ in range(500):
+        fleet.tick_all()
+        for bot in fleet.bots:
+            cells = list(bot.snake)
+            # Snake never overlaps itself and the occupancy grid stays in sync
+            assert len(set(cells)) == len(cells)
+            assert sum(bot.body) == len(cells)
+            assert all(bot.body[c] for c in cells)
+            assert not bot.body[bot.food]
+            # Every segment is a neighbour of the next one
+            for a, b in zip(cells, cells[1:]):
+                assert b in [n for _, n in bot.planner.neighbors[a]]
+
+    assert fleet.bot_ticks == 6 * 500
+    # The planner should be finding food, not wandering
+    assert max(max(bot.score, bot.best_score) for bot in fleet.bots) >= 100
+
+def test_bots_listed_as_active_players(client, monkeypatch):
+    from src.bots import BotFleet
+    from src.routers import spectator
+
+    monkeypatch.setattr(spectator, "bot_fleet", BotFleet(count=3, seed=1))
+
+    response = client.get("/api/spectator/active")
+    ids = [p["id"] for p in response.json()["data"]]
+    assert ids[:2] == ["player1", "player2"]
+    assert sorted(ids[2:]) == ["bot-1", "bot-2", "bot-3"]
+
+    response = client.get("/api/spectator/active?limit=3")
+    assert len(response.json()["data"]) == 3
+
+    response = client.post("/api/spectator/watch/bot-2")
+    data = response.json()["data"]
+    assert data["username"] == "SnakeBot-0002"
+    assert data["viewers"] == 1
+    assert len(data["gameState"]["snake"]) == 3
+
+    client.post("/api/spectator/stop/bot-2")
+    assert spectator.bot_fleet.get("bot-2").viewers == 0
+
+def test_watched_bot_state_follows_the_server_game(client, monkeypatch):
+    import pytest
+    from src.bots import BotFleet
+    from src.routers import spectator
+
+    monkeypatch.setattr(spectator, "bot_fleet", BotFleet(count=1, grid_size=12, seed=3))
+
+    first = client.get("/api/spectator/state/bot-1").json()["data"]["gameState"]
+    assert first["gridSize"] == 12
+    spectator.bot_fleet.tick_all()
+    second = client.get("/api/spectator/state/bot-1").json()["data"]["gameState"]
+    assert second["snake"] != first["snake"]
+    assert second["snake"][1:] == first["snake"][:len(second["snake"]) - 1]
+
+    assert client.get("/api/spectator/state/player1").json()["data"]["gameState"]["gridSize"] == 20
+    assert client.get("/api/spectator/state/nobody").status_code == 404
+
+    with pytest.raises(ValueError):
+        BotFleet(count=1, grid_size=200)
@@ -0,0 +1,226 @@
+import asyncio
+import math
+import random
+
+from src.db.models import Score, User
+from src.leaderboard_cache import leaderboard_cache
+from src.models import GameMode
+from src.stats import (
+    ScoreHistogram, ScoreStats, RELATIVE_ERROR, bucket_index, bucket_bounds, score_stats
+)
+
+def exact_percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q / 100 * len(ordered))) - 1]
+
+def test_buckets_cover_values_in_order():
+    previous = -1
+    for value in list(range(5000)) + [10**6, 10**9, 2**40 + 12345]:
+        index = bucket_index(value)
+        low, high = bucket_bounds(index)
+        assert low <= value <= high
+        assert index >= previous
+        previous = index
+
+def test_percentiles_within_error_bound():
+    rng = random.Random(3)
+    values = [int(rng.lognormvariate(7, 1.5)) for _ in range(20000)]
+    sketch = ScoreHistogram()
+    for v in values:
+        sketch.add(v)
+
+    qs = [1, 10, 25, 50, 75, 90, 95, 99, 99.9, 100]
+    approx = sketch.percentiles(qs)
+    for q in qs:
+        exact = exact_percentile(values, q)
+        assert abs(approx[q] - exact) <= RELATIVE_ERROR * exact, (q, approx[q], exact)
+
+    assert sketch.total == len(values)
+    assert sketch.mean == sum(values) / len(values)
+    # Bounded size regardless of how many values went in
+    assert len(sketch.counts) < 2000
+
+def test_merge_and_remove():
+    rng = random.Random(5)
+    a, b, both = ScoreHistogram(), ScoreHistogram(), ScoreHistogram()
+    for i in range(3000):
+        value = rng.randrange(100000)
+        (a if i % 2 else b).add(value)
+        both.add(value)
+
+    a.merge(b)
+    assert a.counts == both.counts
+    assert (a.total, a.sum, a.min, a.max) == (both.total, both.sum, both.min, both.max)
+
+    a.add(123456)
+    a.remove(123456)
+    assert a.counts == both.counts
+
+    restored = ScoreHistogram.from_json(a.to_json())
+    assert restored.percentiles([50, 99]) == a.percentiles([50, 99])
+
+def test_fraction_below():
+    sketch = ScoreHistogram()
+    for value in range(1, 101):
+        sketch.add(value)
+    assert sketch.fraction_below(1) == 0
+    assert sketch.fraction_below(51) == 0.5
+    assert sketch.fraction_below(1000) == 1
+
+def test_player_and_mode_stats(client):
+    for name in ["ann", "ben", "cat"]:
+        client.post("/api/auth/signup", json={"username": name, "email": f"{name}@t.com", "password": "p"})
+
+    for name, score in [("ann", 10), ("ann", 30), ("ben", 20), ("cat", 50), ("cat", 40), ("ann", 20)]:
+        client.post("/api/leaderboard/", json={"username": name, "score": score, "mode": "walls"})
+    client.post("/api/leaderboard/", json={"username": "ann", "score": 5, "mode": "pass-through"})
+
+    res = client.get("/api/stats/players/ann")
+    assert res.status_code == 200
+    by_mode = {s["mode"]: s for s in res.json()["data"]}
+    walls = by_mode["walls"]
+    assert (walls["games"], walls["best"], walls["mean"]) == (3, 30, 20)
+    assert walls["percentiles"]["p50"] == 20
+    assert sum(b["count"] for b in walls["histogram"]) == 3
+    # Player bests in walls: ann 30, ben 20, cat 50 -> ann beats 1 of 3
+    assert walls["beatsPercent"] == 33.33
+    assert by_mode["pass-through"]["games"] == 1
+
+    data = client.get("/api/stats/players/cat?mode=walls").json()["data"]
+    assert [s["beatsPercent"] for s in data] == [66.67]
+    assert client.get("/api/stats/players/ghost").status_code == 404
+
+    data = client.get("/api/stats/modes/walls?score=25").json()["data"]
+    assert (data["games"], data["players"]) == (6, 3)
+    assert data["percentiles"]["p50"] == 20
+    assert data["bestPercentiles"]["p99"] == 50
+    assert data["beatsPercent"] == 33.33
+
+def test_stats_persist_and_reload(client, db_session):
+    client.post("/api/auth/signup", json={"username": "ann", "email": "ann@t.com", "password": "p"})
+    for score in (10, 20, 30):
+        client.post("/api/leaderboard/", json={"username": "ann", "score": score, "mode": "walls"})
+    score_stats.flush()
+
+    # A fresh process trusts the persisted sketches while they cover every score
+    reloaded = ScoreStats()
+    assert reloaded._load(db_session.get_bind()) is not None
+    assert asyncio.run(reloaded.scores(db_session, GameMode.WALLS)).total == 3
+
+    # Scores written after the last flush make them stale -> rebuilt from the table
+    client.post("/api/leaderboard/", json={"username": "ann", "score": 40, "mode": "walls"})
+    stale = ScoreStats()
+    assert stale._load(db_session.get_bind()) is None
+    assert asyncio.run(stale.scores(db_session, GameMode.WALLS)).total == 4
+
+def test_stats_rebuild_off_submit_path(client):
+    client.post("/api/auth/signup", json={"username": "ann", "email": "ann@t.com", "password": "p"})
+    client.post("/api/leaderboard/", json={"username": "ann", "score": 10, "mode": "walls"})
+    assert score_stats.is_current()
+
+    rebuilt_on_loop = []
+    rebuild = score_stats.rebuild
+
+    def watched_rebuild(bind):
+        try:
+            asyncio.get_running_loop()
+            rebuilt_on_loop.append(True)
+        except RuntimeError:
+            rebuilt_on_loop.append(False)
+        rebuild(bind)
+
+    score_stats.rebuild = watched_rebuild
+    try:
+        leaderboard_cache.invalidate()
+        client.post("/api/leaderboard/", json={"username": "ann", "score": 20, "mode": "walls"})
+    finally:
+        del score_stats.rebuild
+    # Built once, in a worker thread, by the background task
+    assert rebuilt_on_loop == [False]
+    assert score_stats.is_current()
+    data = client.get("/api/stats/modes/walls").json()["data"]
+    assert (data["games"], data["players"]) == (2, 1)
+
+def test_stats_replay_scores_submitted_during_build(client, db_session, monkeypatch):
+    client.post("/api/auth/signup", json={"username": "ann", "email": "ann@t.com", "password": "p"})
+    user = db_session.query(User).one()
+    scan = ScoreStats._scan
+
+    def submit(score):
+        row = Score(user_id=user.id, score=score, mode="walls")
+        db_session.add(row)
+        db_session.commit()
+        score_stats.record(row)
+
+    def slow_scan(bind, recent_after):
+        # Committed during the build but before the scan read the table...
+        submit(100)
+        result = scan(bind, recent_after)
+        # ...and after it
+        submit(200)
+        return result
+
+    monkeypatch.setattr(ScoreStats, "_scan", staticmethod(slow_scan))
+    submit(50)
+    leaderboard_cache.invalidate()
+    score_stats.rebuild(db_session.get_bind())
+
+    assert score_stats.is_current()
+    scores = asyncio.run(score_stats.scores(db_session, GameMode.WALLS))
+    assert (scores.total, scores.sum) == (3, 350)
+
+def test_stats_load_folds_in_queued_scores(client, db_session, monkeypatch):
+    client.post("/api/auth/signup", json={"username": "ann", "email": "ann@t.com", "password": "p"})
+    client.post("/api/leaderboard/", json={"username": "ann", "score": 10, "mode": "walls"})
+    score_stats.flush()
+
+    # After a restart a score lands before the first build: the persisted
+    # sketches are still used, with the score folded in
+    restarted = ScoreStats()
+    row = Score(user_id=db_session.query(User).one().id, score=30, mode="walls")
+    db_session.add(row)
+    db_session.commit()
+    restarted.record(row)
+
+    def no_scan(bind, recent_after):
+        raise AssertionError("persisted sketches should have been used")
+
+    monkeypatch.setattr(ScoreStats, "_scan", staticmethod(no_scan))
+    restarted.rebuild(db_session.get_bind())
+    scores = asyncio.run(restarted.scores(db_session, GameMode.WALLS))
+    assert (scores.total, scores.max) == (2, 30)
+
+def test_flusher_survives_errors(monkeypatch):
+    from src import stats
+
+    monkeypatch.setattr(stats, "STATS_FLUSH_SECONDS", 0)
+    sketches = ScoreStats()
+    calls = []
+
+    def flaky_flush():
+        calls.append(1)
+        if len(calls) <= 2:
+            raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(sketches, "flush", flaky_flush)
+
+    async def scenario():
+        sketches.start()
+        while len(calls) < 4:
+            await asyncio.sleep(0)
+        assert not sketches._task.done()
+        await sketches.stop()
+
+    asyncio.run(scenario())
+
+    # A task that died anyway, and a failing final flush, don't break shutdown
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def shutdown():
+        sketches._task = asyncio.get_running_loop().create_task(broken())
+        await asyncio.sleep(0)
+        calls.clear()
+        await sketches.stop()
+
+    asyncio.run(shutdown())
@@ -95,6 +95,81 @@ describe('API Service', () => {
     });
   });
 
+  describe('leaderboardApi.subscribe', () => {
+    class FakeEventSource {
+      static instances: FakeEventSource[] = [];
+      listeners: Record<string, ((event: MessageEvent) => void)[]> = {};
+      closed = false;
+
+      constructor(public url: string) {
+        FakeEventSource.instances.push(this);
+      }
+
+      addEventListener(type: string, listener: (event: MessageEvent) => void) {
+        (this.listeners[type] ??= []).push(listener);
+      }
+
+      close() {
+        this.closed = true;
+      }
+
+      emit(type: string, data: unknown) {
+        for (const listener of this.listeners[type] ?? []) {
+          listener({ data: JSON.stringify(data) } as MessageEvent);
+        }
+      }
+    }
+
+    const board: LeaderboardEntry[] = [
+      { id: '1', rank: 1, username: 'Player1', score: 100, mode: 'walls', playedAt: '2024-01-01' },
+    ];
+    const entry: LeaderboardEntry = { id: '3', rank: 2, username: 'Player3', score: 70, mode: 'walls', playedAt: '2024-01-02' };
+
+    beforeEach(() => {
+      FakeEventSource.instances = [];
+      vi.stubGlobal('EventSource', FakeEventSource);
+    });
+
+    afterEach(() => {
+      vi.unstubAllGlobals();
+    });
+
+    it('delivers the snapshot, then rank patches', () => {
+      const onSnapshot = vi.fn();
+      const onRanks = vi.fn();
+      const close = leaderboardApi.subscribe('walls', onSnapshot, onRanks);
+
+      const [source] = FakeEventSource.instances;
+      expect(source.url).toBe('http://localhost:8000/api/leaderboard/stream?mode=walls');
+      source.emit('snapshot', { mode: 'walls', version: 3, entries: board });
+      source.emit('ranks', { mode: 'walls', version: 4, entries: [entry] });
+
+      expect(onSnapshot).toHaveBeenCalledWith(board);
+      expect(onRanks).toHaveBeenCalledWith([entry]);
+      expect(fetchMock).not.toHaveBeenCalled();
+
+      close();
+      expect(source.closed).toBe(true);
+    });
+
+    it('reopens the stream for a fresh snapshot on resync', () => {
+      const onSnapshot = vi.fn();
+      const close = leaderboardApi.subscribe(undefined, onSnapshot, vi.fn());
+
+      const [first] = FakeEventSource.instances;
+      first.emit('resync', { mode: null });
+      expect(first.closed).toBe(true);
+
+      const second = FakeEventSource.instances[1];
+      expect(second.url).toBe('http://localhost:8000/api/leaderboard/stream');
+      second.emit('snapshot', { mode: null, version: 9, entries: board });
+      expect(onSnapshot).toHaveBeenCalledWith(board);
+
+      close();
+      expect(second.closed).toBe(true);
+    });
+  });
+
   describe('gameApi', () => {
     it('saveGame succeeds', async () => {
       fetchMock.mockResolvedValueOnce({
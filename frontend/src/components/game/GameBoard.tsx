@@ -42,6 +42,7 @@ Cell.displayName = 'Cell';
 
 export const GameBoard = memo(({ gameState, isSpectator = false, finalScore = 0 }: GameBoardProps & { finalScore?: number }) => {
   const { snake, food, status } = gameState;
+  const gridSize = gameState.gridSize ?? GRID_SIZE;
 
   // Create a map for quick lookup
   const snakeMap = new Map<string, number>();
@@ -50,8 +51,8 @@ export const GameBoard = memo(({ gameState, isSpectator = false, finalScore = 0
   });
 
   const cells = [];
-  for (let y = 0; y < GRID_SIZE; y++) {
-    for (let x = 0; x < GRID_SIZE; x++) {
+  for (let y = 0; y < gridSize; y++) {
+    for (let x = 0; x < gridSize; x++) {
       const key = `${x},${y}`;
       const snakeIndex = snakeMap.get(key);
       const isSnakeHead = snakeIndex === 0;
@@ -83,7 +84,7 @@ export const GameBoard = memo(({ gameState, isSpectator = false, finalScore = 0
         className="game-grid bg-grid-line p-1"
         style={{
           display: 'grid',
-          gridTemplateColumns: `repeat(${GRID_SIZE}, 1fr)`,
+          gridTemplateColumns: `repeat(${gridSize}, 1fr)`,
           gap: '1px',
         }}
       >
@@ -16,17 +16,27 @@ export function Leaderboard({ className }: LeaderboardProps) {
   const [selectedMode, setSelectedMode] = useState<GameMode | 'all'>('all');
 
   useEffect(() => {
-    const fetchLeaderboard = async () => {
-      setIsLoading(true);
-      const mode = selectedMode === 'all' ? undefined : selectedMode;
-      const response = await leaderboardApi.getLeaderboard(mode);
-      if (response.success && response.data) {
-        setEntries(response.data);
-      }
-      setIsLoading(false);
-    };
+    setIsLoading(true);
+    const mode = selectedMode === 'all' ? undefined : selectedMode;
 
-    fetchLeaderboard();
+    // The stream starts with a snapshot of the board and then patches changed
+    // ranks in place; both come from one feed, so no update falls in between
+    return leaderboardApi.subscribe(
+      mode,
+      (snapshot) => {
+        setEntries(snapshot);
+        setIsLoading(false);
+      },
+      (changed) => {
+        setEntries(prev => {
+          const next = [...prev];
+          for (const entry of changed) {
+            next[entry.rank - 1] = entry;
+          }
+          return next;
+        });
+      },
+    );
   }, [selectedMode]);
 
   const getRankIcon = (rank: number) => {
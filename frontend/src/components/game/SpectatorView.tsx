@@ -1,90 +1,49 @@
-import React, { useState, useEffect, useCallback, useRef } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { Button } from '@/components/ui/button';
 import { ScrollArea } from '@/components/ui/scroll-area';
 import { GameBoard } from './GameBoard';
-import type { ActivePlayer, GameState, Direction } from '@/types';
+import type { ActivePlayer } from '@/types';
 import { spectatorApi } from '@/services/api';
 import { Eye, Users, ArrowLeft, Loader2 } from 'lucide-react';
 import { cn } from '@/lib/utils';
-import { moveSnake, changeDirection, GRID_SIZE, generateFood } from '@/lib/gameLogic';
 
 interface SpectatorViewProps {
   className?: string;
 }
 
-// Simulates AI playing the game
-function useSimulatedGame(initialState: GameState) {
-  const [gameState, setGameState] = useState<GameState>(initialState);
-  const intervalRef = useRef<number | null>(null);
+// How often the watched game is refetched; matches the server bots' default tick
+const POLL_INTERVAL_MS = 150;
+
+// Follows a game played on the server by polling its current state
+function useLiveGame(initialPlayer: ActivePlayer) {
+  const [player, setPlayer] = useState<ActivePlayer>(initialPlayer);
 
   useEffect(() => {
-    setGameState({ ...initialState, status: 'playing' });
-    
-    intervalRef.current = window.setInterval(() => {
-      setGameState(prev => {
-        if (prev.status !== 'playing') return prev;
-        
-        // Simple AI: Try to move towards food, avoid walls
-        const head = prev.snake[0];
-        const food = prev.food;
-        
-        let newDirection = prev.direction;
-        
-        // Random chance to change direction towards food
-        if (Math.random() < 0.3) {
-          const dx = food.x - head.x;
-          const dy = food.y - head.y;
-          
-          const possibleDirections: Direction[] = [];
-          
-          if (dx > 0 && prev.direction !== 'LEFT') possibleDirections.push('RIGHT');
-          if (dx < 0 && prev.direction !== 'RIGHT') possibleDirections.push('LEFT');
-          if (dy > 0 && prev.direction !== 'UP') possibleDirections.push('DOWN');
-          if (dy < 0 && prev.direction !== 'DOWN') possibleDirections.push('UP');
-          
-          if (possibleDirections.length > 0) {
-            newDirection = possibleDirections[Math.floor(Math.random() * possibleDirections.length)];
-          }
-        }
-        
-        let newState = changeDirection(prev, newDirection);
-        newState = moveSnake(newState);
-        
-        // If game over, restart
-        if (newState.status === 'game-over') {
-          const centerX = Math.floor(GRID_SIZE / 2);
-          const centerY = Math.floor(GRID_SIZE / 2);
-          const newSnake = [
-            { x: centerX, y: centerY },
-            { x: centerX + 1, y: centerY },
-            { x: centerX + 2, y: centerY },
-          ];
-          return {
-            ...prev,
-            snake: newSnake,
-            food: generateFood(newSnake),
-            direction: 'LEFT',
-            score: Math.floor(Math.random() * 200) + 50,
-            status: 'playing',
-          };
-        }
-        
-        return newState;
-      });
-    }, 150);
+    let cancelled = false;
+    let timeout: number | undefined;
 
-    return () => {
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
+    // Chained timeouts rather than an interval, so slow responses never overlap
+    const poll = async () => {
+      const response = await spectatorApi.getPlayerState(initialPlayer.id);
+      if (cancelled) return;
+      if (response.success && response.data) {
+        setPlayer(response.data);
       }
+      timeout = window.setTimeout(poll, POLL_INTERVAL_MS);
     };
-  }, []);
+    timeout = window.setTimeout(poll, POLL_INTERVAL_MS);
+
+    return () => {
+      cancelled = true;
+      window.clearTimeout(timeout);
+    };
+  }, [initialPlayer.id]);
 
-  return gameState;
+  return player;
 }
 
-function PlayerGameView({ player, onBack }: { player: ActivePlayer; onBack: () => void }) {
-  const simulatedState = useSimulatedGame(player.gameState);
+function PlayerGameView({ player: initialPlayer, onBack }: { player: ActivePlayer; onBack: () => void }) {
+  const player = useLiveGame(initialPlayer);
 
   return (
     <div className="space-y-4">
@@ -100,13 +59,13 @@ function PlayerGameView({ player, onBack }: { player: ActivePlayer; onBack: () =
           </p>
         </div>
         <div className="text-right">
-          <p className="font-display text-2xl text-accent text-glow-accent">{simulatedState.score}</p>
+          <p className="font-display text-2xl text-accent text-glow-accent">{player.score}</p>
           <p className="text-xs text-muted-foreground capitalize">{player.mode}</p>
         </div>
       </div>
       
       <div className="aspect-square max-w-md mx-auto">
-        <GameBoard gameState={simulatedState} isSpectator />
+        <GameBoard gameState={player.gameState} isSpectator />
       </div>
       
       <p className="text-center text-sm text-muted-foreground">
@@ -8,6 +8,7 @@ import type {
   LoginCredentials,
   SignupCredentials,
   LeaderboardEntry,
+  LeaderboardSlice,
   ActivePlayer,
   GameMode,
   ApiResponse,
@@ -98,12 +99,52 @@ export const leaderboardApi = {
     return request<LeaderboardEntry[]>(`/leaderboard/${query}`);
   },
 
+  async getAround(username: string, mode?: GameMode, radius = 5): Promise<ApiResponse<LeaderboardSlice>> {
+    const params = new URLSearchParams({ radius: String(radius) });
+    if (mode) params.set('mode', mode);
+    return request<LeaderboardSlice>(`/leaderboard/around/${encodeURIComponent(username)}?${params}`);
+  },
+
   async submitScore(score: number, mode: GameMode, username: string): Promise<ApiResponse<LeaderboardEntry>> {
     return request<LeaderboardEntry>('/leaderboard/', {
       method: 'POST',
       body: JSON.stringify({ score, mode, username }),
     });
   },
+
+  /**
+   * Subscribe to the live board over Server-Sent Events.
+   * `onSnapshot` receives the whole board whenever the stream (re)connects;
+   * `onRanks` receives only the entries whose rank changed since, and applies
+   * on top of the last snapshot. When the server reports that updates were
+   * dropped (`resync`) the stream is reopened, which starts with a new snapshot.
+   * Returns a function that closes the stream.
+   */
+  subscribe(
+    mode: GameMode | undefined,
+    onSnapshot: (entries: LeaderboardEntry[]) => void,
+    onRanks: (entries: LeaderboardEntry[]) => void,
+  ): () => void {
+    const query = mode ? `?mode=${mode}` : '';
+    let source: EventSource;
+
+    const open = () => {
+      source = new EventSource(`${API_BASE}/leaderboard/stream${query}`);
+      source.addEventListener('snapshot', (event) => {
+        onSnapshot(JSON.parse((event as MessageEvent).data).entries);
+      });
+      source.addEventListener('ranks', (event) => {
+        onRanks(JSON.parse((event as MessageEvent).data).entries);
+      });
+      source.addEventListener('resync', () => {
+        source.close();
+        open();
+      });
+    };
+    open();
+
+    return () => source.close();
+  },
 };
 
 // ============ Spectator API ============
@@ -113,6 +154,10 @@ export const spectatorApi = {
     return request<ActivePlayer[]>('/spectator/active');
   },
 
+  async getPlayerState(playerId: string): Promise<ApiResponse<ActivePlayer>> {
+    return request<ActivePlayer>(`/spectator/state/${playerId}`);
+  },
+
   async watchPlayer(playerId: string): Promise<ApiResponse<ActivePlayer>> {
     return request<ActivePlayer>(`/spectator/watch/${playerId}`, {
       method: 'POST',
@@ -16,6 +16,8 @@ export interface GameState {
   status: GameStatus;
   mode: GameMode;
   speed: number;
+  // Board width/height in cells; GRID_SIZE when absent (local games)
+  gridSize?: number;
 }
 
 // User Types
@@ -36,11 +38,29 @@ export interface AuthState {
 // Leaderboard Types
 export interface LeaderboardEntry {
   id: string;
+  // Place on the leaderboard, 0 if the score isn't on it
   rank: number;
   username: string;
   score: number;
   mode: GameMode;
   playedAt: string;
+  // Only on a submitted score: its place among players' bests (null while unknown)
+  playerRank?: number | null;
+}
+
+// A player's best score, ranked against every other player's best
+export interface PlayerRank {
+  id: string;
+  playerRank: number;
+  username: string;
+  score: number;
+  mode: GameMode;
+  playedAt: string;
+}
+
+export interface LeaderboardSlice {
+  playerRank: number;
+  entries: PlayerRank[];
 }
 
 // Spectator Types